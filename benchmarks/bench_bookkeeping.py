@@ -0,0 +1,74 @@
+"""Бенчмарк учета ссылок краулера: фронтир, дедупликация и раскладка по спискам.
+
+Обход сайта моделируется без сети: каждая «страница» отдает порцию ссылок, часть
+которых уже встречалась, и все они проходят через Crawler._process_extracted так же,
+как при настоящем обходе. Время на одну обнаруженную ссылку должно оставаться
+постоянным при росте их числа, то есть общее время учета растет линейно.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_bookkeeping [--sizes 1000 10000 100000]
+"""
+import argparse
+import random
+import time
+
+from crawler.src.crawler_core import Crawler
+
+BASE_URL = 'http://example.com'
+NEW_LINKS_PER_PAGE = 10
+REPEATED_LINKS_PER_PAGE = 40
+
+
+def generate_pages(total_links: int, seed: int) -> list[tuple[list[str], list[str]]]:
+    """Ссылки и email-адреса страниц: новые ссылки, повторы уже виденных, файл и внешняя ссылка."""
+    rng = random.Random(seed)
+    known: list[str] = []
+    pages = []
+    for page in range(total_links // NEW_LINKS_PER_PAGE + 1):
+        links = [f"/section-{page % 97}/page-{page}-{i}.html" for i in range(NEW_LINKS_PER_PAGE)]
+        known.extend(links)
+        links += [rng.choice(known) for _ in range(REPEATED_LINKS_PER_PAGE)]
+        links.append(f"/files/document-{rng.randrange(total_links)}.pdf")
+        links.append(f"https://partner-{rng.randrange(1000)}.example.org/")
+        pages.append((links, [f"user{rng.randrange(1000)}@example.com"]))
+    return pages
+
+
+def run(total_links: int, seed: int = 0) -> tuple[float, int, int]:
+    """Обходит смоделированный сайт до total_links уникальных ссылок.
+
+    Возвращает (секунды учета, обнаружено ссылок, обработано страниц).
+    """
+    pages = generate_pages(total_links, seed)
+    crawler = Crawler(BASE_URL, max_urls=len(pages) + 1)
+    started = time.perf_counter()
+    for links, emails in pages:
+        if len(crawler.data['links']) >= total_links or not crawler.to_crawl:
+            break
+        # То же, что делает Crawler._worker перед загрузкой страницы
+        url, _ = crawler.to_crawl.popleft()
+        crawler._queued.discard(url)
+        crawler.crawled.add(url)
+        crawler._process_extracted(url, links, emails)
+    return time.perf_counter() - started, len(crawler.data['links']), len(crawler.crawled)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl bookkeeping time versus discovered links")
+    parser.add_argument("--sizes", type=int, nargs='+', default=[1000, 10000, 100000],
+                        help="Numbers of discovered links to simulate (default: 1000 10000 100000)")
+    parser.add_argument("--repeat", type=int, default=3, help="Best of this many runs per size (default: 3)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the simulated site")
+    args = parser.parse_args()
+
+    print(f"{'links':>10} {'pages':>8} {'seconds':>9} {'us/link':>8} {'vs first':>9}")
+    first = None
+    for size in args.sizes:
+        seconds, links, pages = min(run(size, args.seed) for _ in range(max(1, args.repeat)))
+        per_link = seconds / links * 1e6
+        first = first or per_link
+        print(f"{links:>10} {pages:>8} {seconds:>9.3f} {per_link:>8.2f} {per_link / first:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
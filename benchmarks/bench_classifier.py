@@ -0,0 +1,78 @@
+"""Микробенчмарки классификации ссылок на записанном корпусе URL.
+
+Корпус benchmarks/data/url_corpus.tsv.gz — пары «URL страницы, href» с реального
+сайта (см. benchmarks/record_url_corpus.py). Сравниваются функции crawler_utils и
+UrlClassifier, которым краулер пользуется на каждой ссылке:
+normalize_url против UrlClassifier.normalize/classify, is_file_url против
+UrlClassifier.is_file, а также extract_directories.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_classifier [--corpus benchmarks/data/url_corpus.tsv.gz]
+"""
+import argparse
+import gc
+import gzip
+import pathlib
+import time
+from typing import Callable
+from urllib.parse import urlsplit
+
+from crawler.src.crawler_utils import UrlClassifier, normalize_url, is_file_url, extract_directories
+from benchmarks.record_url_corpus import DEFAULT_OUTPUT
+
+
+def load_corpus(path: pathlib.Path) -> list[tuple[str, str]]:
+    """Пары (URL страницы, href) из gzip-TSV."""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return [tuple(line.rstrip('\n').split('\t', 1)) for line in f]
+
+
+def best_time(function: Callable[[], object], repeat: int) -> float:
+    """Лучшее время из repeat запусков, в секундах; сборщик мусора на время замера выключен, как в timeit."""
+    best = float('inf')
+    gc.disable()
+    try:
+        for _ in range(max(1, repeat)):
+            started = time.perf_counter()
+            function()
+            best = min(best, time.perf_counter() - started)
+    finally:
+        gc.enable()
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="URL classification micro-benchmarks on a recorded corpus")
+    parser.add_argument("--corpus", type=pathlib.Path, default=DEFAULT_OUTPUT,
+                        help=f"Gzipped TSV of page URL and href pairs (default: {DEFAULT_OUTPUT})")
+    parser.add_argument("--repeat", type=int, default=5, help="Best of this many runs (default: 5)")
+    args = parser.parse_args()
+
+    pairs = load_corpus(args.corpus)
+    base_url = pairs[0][0]
+    classifier = UrlClassifier(base_url)
+    # Краулер разбирает netloc страницы один раз на страницу, а не на каждую ссылку
+    netlocs = {page_url: urlsplit(page_url).netloc for page_url, _ in pairs}
+    with_netloc = [(href, page_url, netlocs[page_url]) for page_url, href in pairs]
+    urls = [url for url in (normalize_url(href, page_url) for page_url, href in pairs) if url]
+
+    benchmarks: list[tuple[str, int, Callable[[], object]]] = [
+        ("normalize_url", len(pairs), lambda: [normalize_url(href, page_url) for page_url, href in pairs]),
+        ("UrlClassifier.normalize", len(pairs),
+         lambda: [classifier.normalize(href, page_url, netloc) for href, page_url, netloc in with_netloc]),
+        ("UrlClassifier.classify", len(pairs),
+         lambda: [classifier.classify(href, page_url, netloc) for href, page_url, netloc in with_netloc]),
+        ("is_file_url", len(urls), lambda: [is_file_url(url) for url in urls]),
+        ("UrlClassifier.is_file", len(urls), lambda: [classifier.is_file(url) for url in urls]),
+        ("extract_directories", len(urls), lambda: [extract_directories(url) for url in urls]),
+    ]
+
+    print(f"{len(pairs)} links from {len(netlocs)} pages, {len(urls)} in scope ({args.corpus.name})")
+    print(f"{'function':>24} {'calls':>7} {'ms':>8} {'ns/call':>8}")
+    for name, calls, function in benchmarks:
+        seconds = best_time(function, args.repeat)
+        print(f"{name:>24} {calls:>7} {seconds * 1e3:>8.2f} {seconds / calls * 1e9:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
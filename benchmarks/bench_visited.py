@@ -0,0 +1,77 @@
+"""Бенчмарк памяти множеств посещенных URL: set, FingerprintSet и BloomFilter.
+
+Каждое множество заполняется одинаковыми URL (~63 символа) под tracemalloc; в зачет
+идет все, что остается в памяти после заполнения. Для set это хеш-таблица вместе
+со строками URL, которые она удерживает; FingerprintSet и BloomFilter строки не
+хранят. Для фильтра Блума дополнительно измеряется доля ложных срабатываний на
+URL, которые в него не добавлялись.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_visited [--urls 200000] [--bloom-error-rate 1e-4]
+"""
+import argparse
+import time
+import tracemalloc
+
+from crawler.src.crawler_constants import DEFAULT_BLOOM_ERROR_RATE, VISITED_SET_TYPES
+from crawler.src.crawler_visited import make_visited_set
+
+
+def make_url(index: int) -> str:
+    """URL каталога длиной ~63 символа, как у типичной страницы товара."""
+    return f"https://www.example.com/catalog/section-{index % 1000:04d}/item-{index:08d}.html"
+
+
+def fill(kind: str, count: int, error_rate: float):
+    """Множество заданного типа с count URL."""
+    visited = make_visited_set(kind, count, error_rate)
+    for index in range(count):
+        visited.add(make_url(index))
+    return visited
+
+
+def measure(kind: str, count: int, error_rate: float) -> tuple[object, int, float]:
+    """Возвращает (заполненное множество, удерживаемые им байты, секунды заполнения).
+
+    Время снимается отдельным заполнением без tracemalloc, который сильно замедляет выделения.
+    """
+    started = time.perf_counter()
+    fill(kind, count, error_rate)
+    seconds = time.perf_counter() - started
+    tracemalloc.start()
+    visited = fill(kind, count, error_rate)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return visited, retained, seconds
+
+
+def false_positive_rate(visited, count: int, probes: int) -> float:
+    """Доля URL, не добавлявшихся в множество, которые оно все же считает посещенными."""
+    hits = sum(make_url(count + index) in visited for index in range(probes))
+    return hits / probes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory of the crawler's visited-URL sets")
+    parser.add_argument("--urls", type=int, default=200000, help="Number of visited URLs (default: 200000)")
+    parser.add_argument("--bloom-error-rate", type=float, default=DEFAULT_BLOOM_ERROR_RATE,
+                        help=f"False-positive rate of the Bloom filter (default: {DEFAULT_BLOOM_ERROR_RATE})")
+    parser.add_argument("--probes", type=int, default=200000,
+                        help="Unseen URLs checked for false positives (default: 200000)")
+    args = parser.parse_args()
+
+    print(f"{args.urls} URLs, {len(make_url(0))} characters each")
+    print(f"{'kind':>12} {'MiB':>8} {'bytes/url':>10} {'vs set':>7} {'seconds':>8} {'false pos':>10}")
+    baseline = None
+    for kind in VISITED_SET_TYPES:
+        visited, retained, seconds = measure(kind, args.urls, args.bloom_error_rate)
+        baseline = baseline or retained
+        # Ложные срабатывания возможны только у фильтра Блума; для остальных проверка лишь подтверждает ноль
+        rate = false_positive_rate(visited, args.urls, args.probes)
+        print(f"{kind:>12} {retained / 2 ** 20:>8.2f} {retained / args.urls:>10.1f} "
+              f"{retained / baseline:>6.2f}x {seconds:>8.2f} {rate:>10.2e}")
+        del visited
+
+
+if __name__ == "__main__":
+    main()
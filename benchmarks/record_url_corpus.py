@@ -0,0 +1,72 @@
+"""Запись корпуса ссылок для бенчмарков классификации URL.
+
+Обходит локальное зеркало сайта (каталог с HTML-страницами), извлекает ссылки тем
+же PageExtractor, что и краулер, и пишет пары «URL страницы, ссылка как в href» в
+gzip-TSV. Страницы выбираются равномерно по всему дереву, а с одной страницы
+берется не больше --max-per-page ссылок, чтобы корпус не состоял из одного оглавления.
+
+Корпус в benchmarks/data/url_corpus.tsv.gz записан с локальной документации Rust:
+    python -m benchmarks.record_url_corpus \\
+        --root ~/.rustup/toolchains/<toolchain>/share/doc/rust/html \\
+        --base-url https://doc.rust-lang.org/
+"""
+import argparse
+import gzip
+import pathlib
+
+from crawler.src.crawler_parser import PageExtractor
+from crawler.src.crawler_constants import READ_CHUNK_SIZE
+
+DEFAULT_OUTPUT = pathlib.Path(__file__).parent / 'data' / 'url_corpus.tsv.gz'
+PAGES_PER_PASS = 500
+
+
+def page_links(path: pathlib.Path) -> list[str]:
+    """Ссылки страницы в порядке появления, как их видит краулер."""
+    extractor = PageExtractor()
+    links = []
+    with open(path, 'rb') as f:
+        while chunk := f.read(READ_CHUNK_SIZE):
+            extractor.feed_bytes(chunk)
+            links += extractor.drain()[0]
+    extractor.close()
+    return links + extractor.drain()[0]
+
+
+def record(root: pathlib.Path, base_url: str, max_pairs: int, max_per_page: int) -> list[tuple[str, str]]:
+    """Пары (URL страницы, href) с равномерно выбранных страниц зеркала."""
+    pages = sorted(root.rglob('*.html'))
+    pairs: list[tuple[str, str]] = []
+    # Страницы берутся проходами с шагом step и сдвигом: каждый проход покрывает все дерево
+    step = max(1, len(pages) // PAGES_PER_PASS)
+    for path in (path for start in range(step) for path in pages[start::step]):
+        page_url = base_url.rstrip('/') + '/' + path.relative_to(root).as_posix()
+        for href in page_links(path)[:max_per_page]:
+            # Табуляции и переводы строк в href ломают TSV и для бенчмарка не нужны
+            if not any(ch in href for ch in '\t\r\n'):
+                pairs.append((page_url, href))
+        if len(pairs) >= max_pairs:
+            break
+    return pairs[:max_pairs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record (page URL, href) pairs from a mirrored site")
+    parser.add_argument("--root", type=pathlib.Path, required=True, help="Directory with the mirrored HTML pages")
+    parser.add_argument("--base-url", required=True, help="URL the mirror root corresponds to")
+    parser.add_argument("--output", type=pathlib.Path, default=DEFAULT_OUTPUT,
+                        help=f"Gzipped TSV to write (default: {DEFAULT_OUTPUT})")
+    parser.add_argument("--max-pairs", type=int, default=25000, help="Pairs to record (default: 25000)")
+    parser.add_argument("--max-per-page", type=int, default=200, help="Links taken from one page (default: 200)")
+    args = parser.parse_args()
+
+    pairs = record(args.root.expanduser(), args.base_url, args.max_pairs, args.max_per_page)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    # mtime=0: повторная запись того же корпуса дает тот же файл
+    with gzip.GzipFile(args.output, 'wb', mtime=0) as f:
+        f.write(''.join(f"{page_url}\t{href}\n" for page_url, href in pairs).encode('utf-8'))
+    print(f"{len(pairs)} pairs from {len({page for page, _ in pairs})} pages written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,20 @@
 import argparse
+import asyncio
 import logging
+import os
 import pathlib
+from concurrent.futures import ProcessPoolExecutor
 
-from crawler.src.crawler_constants import MAIN_DIR, TARGET_FILE
+import aiohttp
+
+from crawler.src.crawler_constants import MAIN_DIR, TARGET_FILE, DEFAULT_CONCURRENCY, DEFAULT_PER_HOST_LIMIT, \
+    MAX_PAGE_BYTES, DEFAULT_CONNECTION_BUDGET, DEFAULT_PARALLEL_TARGETS, USER_AGENT, CHECKPOINT_DIR, \
+    VISITED_SET_TYPES, DEFAULT_BLOOM_ERROR_RATE, DOWNLOAD_WORKERS, MAX_FILE_BYTES, PROGRESS_INTERVAL, \
+    STREAM_FLUSH_INTERVAL, STREAM_BUFFER_RECORDS
 from crawler.src.crawler_core import Crawler
-from crawler.src.crawler_output import output_results
+from crawler.src.crawler_metrics import CrawlMetrics, write_prometheus
+from crawler.src.crawler_output import output_results, compact_stream
+from ndjson_stream import NDJSONWriter
 
 logging.basicConfig(
     level=logging.INFO,
@@ -26,6 +36,139 @@ def append_unique_url(target_url, urls_input_file=TARGET_FILE):
         print(f"[-] URL уже существует: {target_url}")
 
 
+async def crawl_targets(
+        urls: list[str],
+        crawler_options: dict,
+        parallel_targets: int = DEFAULT_PARALLEL_TARGETS,
+        connection_budget: int = DEFAULT_CONNECTION_BUDGET,
+        stream_file: pathlib.Path | None = None,
+        metrics_file: pathlib.Path | None = None,
+        collected: list[dict] | None = None
+) -> list[dict]:
+    """Сканирует несколько целей параллельно в общем пуле соединений.
+
+    Бюджет соединений делится поровну между одновременно сканируемыми целями,
+    поэтому один большой сайт не забирает все соединения у остальных.
+    Если задан metrics_file, метрики всех целей периодически пишутся в него
+    в текстовом формате Prometheus. Результаты целей по мере готовности
+    складываются в collected: при отмене (Ctrl-C) корутина пробрасывает
+    CancelledError, а в collected к этому моменту лежат и частичные результаты
+    прерванных целей.
+    """
+    parallel_targets = max(1, min(parallel_targets, len(urls)))
+    per_target = max(1, connection_budget // parallel_targets)
+    options = dict(crawler_options)
+    options['concurrency'] = min(options.get('concurrency', DEFAULT_CONCURRENCY), per_target)
+    per_host_limit = options.get('per_host_limit', DEFAULT_PER_HOST_LIMIT)
+
+    results: list[dict | None] = [None] * len(urls)
+    pending = iter(enumerate(urls))
+    stream = NDJSONWriter(stream_file, STREAM_FLUSH_INTERVAL, STREAM_BUFFER_RECORDS) if stream_file else None
+
+    def record_writer(url: str):
+        return lambda key, value: stream.write(key, value, target=url)
+
+    all_metrics: list[CrawlMetrics] = []
+
+    def finish(index: int, url: str, result: dict) -> None:
+        results[index] = {'target': url, 'result': result}
+        if stream:
+            stream.write('result', result, target=url)
+            stream.flush()
+
+    async def export_metrics():
+        interval = options.get('progress_interval') or PROGRESS_INTERVAL
+        while True:
+            await asyncio.sleep(interval)
+            write_prometheus(metrics_file, all_metrics)
+
+    connector = aiohttp.TCPConnector(limit=connection_budget, limit_per_host=per_host_limit)
+    try:
+        async with aiohttp.ClientSession(connector=connector, headers={'User-Agent': USER_AGENT}) as session:
+            async def worker():
+                for index, url in pending:
+                    crawler = Crawler(base_url=url, on_record=record_writer(url) if stream else None, **options)
+                    all_metrics.append(crawler.metrics)
+                    try:
+                        finish(index, url, await crawler.crawl_site(session))
+                    except asyncio.CancelledError:
+                        finish(index, url, crawler.results())
+                        raise
+
+            exporter = asyncio.create_task(export_metrics()) if metrics_file else None
+            try:
+                await asyncio.gather(*(worker() for _ in range(parallel_targets)))
+            finally:
+                if exporter:
+                    exporter.cancel()
+                    await asyncio.gather(exporter, return_exceptions=True)
+    finally:
+        if metrics_file:
+            write_prometheus(metrics_file, all_metrics)
+        if stream:
+            stream.close()
+        if collected is not None:
+            collected[:] = [result for result in results if result is not None]
+    return [result for result in results if result is not None]
+
+
+def _run_crawl_targets(*args) -> list[dict]:
+    """asyncio.run для crawl_targets; Ctrl-C завершает сканирование с частичными результатами.
+
+    asyncio.run отменяет основную задачу по SIGINT и поднимает KeyboardInterrupt, когда
+    она завершится; только здесь, на верхнем уровне, прерывание и поглощается.
+    """
+    collected: list[dict] = []
+    try:
+        return asyncio.run(crawl_targets(*args, collected=collected))
+    except KeyboardInterrupt:
+        logger.info("Сканирование целей прервано, сохраняются частичные результаты")
+        return collected
+
+
+def _crawl_targets_in_process(urls: list[str], crawler_options: dict, parallel_targets: int,
+                              connection_budget: int, stream_file: pathlib.Path | None,
+                              metrics_file: pathlib.Path | None = None) -> list[dict]:
+    """Точка входа для процесса пула: свой цикл событий и своя доля бюджета соединений."""
+    if metrics_file:
+        # Каждый процесс пишет свой файл метрик: <имя>.<pid><расширение>
+        metrics_file = metrics_file.with_name(f"{metrics_file.stem}.{os.getpid()}{metrics_file.suffix}")
+    return _run_crawl_targets(urls, crawler_options, parallel_targets, connection_budget, stream_file, metrics_file)
+
+
+def run_targets(urls: list[str], crawler_options: dict, parallel_targets: int, connection_budget: int,
+                processes: int, stream_file: pathlib.Path | None = None,
+                metrics_file: pathlib.Path | None = None) -> list[dict]:
+    """Запускает сканирование целей в текущем процессе или распределяет их по пулу процессов."""
+    processes = max(1, min(processes, len(urls)))
+    if processes == 1:
+        return _run_crawl_targets(urls, crawler_options, parallel_targets, connection_budget, stream_file,
+                                  metrics_file)
+
+    chunks = [urls[i::processes] for i in range(processes)]
+    budget = max(1, connection_budget // processes)
+    parallel = max(1, parallel_targets // processes)
+    by_target = {}
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [
+            executor.submit(
+                _crawl_targets_in_process, chunk, crawler_options, parallel, budget, stream_file, metrics_file
+            )
+            for chunk in chunks
+        ]
+        for future in futures:
+            try:
+                chunk_results = future.result()
+            except KeyboardInterrupt:
+                # SIGINT получают и рабочие процессы: они сами останавливаются и возвращают
+                # частичные результаты, их и дожидаемся (повторный Ctrl-C прерывает ожидание)
+                logger.info("Ожидание частичных результатов рабочих процессов")
+                chunk_results = future.result()
+            for result in chunk_results:
+                by_target[result['target']] = result
+    return [by_target[url] for url in urls if url in by_target]
+
+
 def parse_arguments():
     """Парсинг аргументов командной строки."""
     parser = argparse.ArgumentParser(description="Web crawler for scanning a website.")
@@ -52,6 +195,97 @@ def parse_arguments():
         default=5000,
         help="Maximum number of URLs to crawl (default: 5000)",
     )
+    parser.add_argument(
+        "-c", "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Number of concurrent crawl workers (default: {DEFAULT_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--per-host",
+        type=int,
+        default=DEFAULT_PER_HOST_LIMIT,
+        help=f"Maximum concurrent connections per host (default: {DEFAULT_PER_HOST_LIMIT})",
+    )
+    parser.add_argument(
+        "--max-page-bytes",
+        type=int,
+        default=MAX_PAGE_BYTES,
+        help=f"Stop reading a page after this many bytes, 0 for no limit (default: {MAX_PAGE_BYTES})",
+    )
+    parser.add_argument(
+        "--parallel-targets",
+        type=int,
+        default=DEFAULT_PARALLEL_TARGETS,
+        help=f"Number of targets crawled at the same time (default: {DEFAULT_PARALLEL_TARGETS})",
+    )
+    parser.add_argument(
+        "--connection-budget",
+        type=int,
+        default=DEFAULT_CONNECTION_BUDGET,
+        help=f"Total open connections shared by all targets (default: {DEFAULT_CONNECTION_BUDGET})",
+    )
+    parser.add_argument(
+        "-p", "--processes",
+        type=int,
+        default=1,
+        help="Spread targets over this many worker processes (default: 1)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Append results to <output>.ndjson as they are found and compact them into the JSON output at the end",
+    )
+    parser.add_argument(
+        "--compact-stream",
+        metavar="NDJSON_FILE",
+        help="Only compact an existing NDJSON stream (e.g. from an interrupted run) into the JSON output",
+    )
+    parser.add_argument(
+        "--download-workers",
+        type=int,
+        default=DOWNLOAD_WORKERS,
+        help=f"Concurrent background file downloads per target (default: {DOWNLOAD_WORKERS})",
+    )
+    parser.add_argument(
+        "--max-file-bytes",
+        type=int,
+        default=MAX_FILE_BYTES,
+        help=f"Skip downloaded files larger than this many bytes, 0 for no limit (default: {MAX_FILE_BYTES})",
+    )
+    parser.add_argument(
+        "--visited",
+        choices=VISITED_SET_TYPES,
+        default="set",
+        help="Visited-URL storage: exact strings, compact 64-bit fingerprints or a Bloom filter (default: set)",
+    )
+    parser.add_argument(
+        "--bloom-error-rate",
+        type=float,
+        default=DEFAULT_BLOOM_ERROR_RATE,
+        help=f"False-positive rate of the Bloom filter for --visited bloom (default: {DEFAULT_BLOOM_ERROR_RATE})",
+    )
+    parser.add_argument(
+        "--progress-interval",
+        type=float,
+        default=PROGRESS_INTERVAL,
+        help=f"Seconds between progress log lines with live crawl metrics, 0 to disable (default: {PROGRESS_INTERVAL})",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        help="Periodically write crawl metrics in Prometheus text format to this file "
+             "(per-process <name>.<pid> files with --processes)",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        action="store_true",
+        help=f"Periodically save the crawl frontier and results to {CHECKPOINT_DIR} so the crawl can be resumed",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume interrupted crawls from their checkpoints (implies --checkpoint)",
+    )
     parser.add_argument(
         "-v", "--verbose",
         action="store_true",
@@ -111,6 +345,17 @@ def main():
     elif args.verbose:
         logging.getLogger().setLevel(logging.INFO)
 
+    OUTPUT_PATH: pathlib.Path = MAIN_DIR / pathlib.Path(args.output)
+
+    # Только сборка NDJSON-потока прерванного запуска в итоговый JSON
+    if args.compact_stream:
+        try:
+            output_results(compact_stream(pathlib.Path(args.compact_stream)), OUTPUT_PATH)
+        except Exception as e:
+            logger.error(f"Ошибка при сборке потока {args.compact_stream}: {e}")
+            exit(1)
+        return
+
     # Обработка расширений файлов
     extensions = []
     if args.file_extension:
@@ -151,26 +396,39 @@ def main():
     subdomains = args.subdomains
     follow_redirect = args.follow_redirect
 
-    all_results = []
-    for url in urls:
-        crawler = Crawler(
-            base_url=url,
-            max_urls=max_urls,
-            fetch_files=fetch_files,
-            subdomains=subdomains,
-            follow_redirects=follow_redirect,
-            extensions=extensions,
-            exclude_extensions=exclude_extensions
-        )
-        data = crawler.crawl_site()
-        all_results.append({
-            'target': url,
-            'result': data
-        })
+    crawler_options = {
+        'max_urls': max_urls,
+        'fetch_files': fetch_files,
+        'subdomains': subdomains,
+        'follow_redirects': follow_redirect,
+        'extensions': extensions,
+        'exclude_extensions': exclude_extensions,
+        'concurrency': args.concurrency,
+        'per_host_limit': args.per_host,
+        'max_page_bytes': args.max_page_bytes,
+        'checkpoint_dir': CHECKPOINT_DIR if args.checkpoint or args.resume else None,
+        'resume': args.resume,
+        'visited': args.visited,
+        'bloom_error_rate': args.bloom_error_rate,
+        'download_workers': args.download_workers,
+        'max_file_bytes': args.max_file_bytes,
+        'progress_interval': args.progress_interval
+    }
+    stream_file = None
+    if args.stream:
+        stream_file = OUTPUT_PATH.with_suffix('.ndjson')
+        # При возобновлении поток дописывается: записи прошлого запуска нужны для сборки
+        if not args.resume:
+            stream_file.unlink(missing_ok=True)
+        logger.info(f"Потоковая запись результатов в {stream_file}")
+    all_results = run_targets(
+        urls, crawler_options, args.parallel_targets, args.connection_budget, args.processes, stream_file,
+        pathlib.Path(args.metrics_file) if args.metrics_file else None
+    )
 
     try:
-        JSON_OUTPUT: pathlib.Path = pathlib.Path(args.output)
-        OUTPUT_PATH: pathlib.Path = MAIN_DIR / JSON_OUTPUT
+        if stream_file:
+            all_results = compact_stream(stream_file, urls)
         output_results(all_results, OUTPUT_PATH)
         logger.info(f"Результаты сохранены в {OUTPUT_PATH}")
     except Exception as e:
@@ -0,0 +1,89 @@
+import hashlib
+import json
+import logging
+import pathlib
+import sqlite3
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS frontier (position INTEGER PRIMARY KEY, url TEXT NOT NULL, depth INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS crawled (url TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS data (kind TEXT NOT NULL, value TEXT NOT NULL, PRIMARY KEY (kind, value));
+CREATE TABLE IF NOT EXISTS messages (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+class CrawlCheckpoint:
+    """Контрольная точка краулера в SQLite: фронтир, посещенные URL и накопленные данные.
+
+    Посещенные URL и данные дописываются инкрементально, фронтир каждый раз
+    сохраняется целиком, поскольку он постоянно меняется.
+    """
+
+    def __init__(self, path: pathlib.Path):
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(SCHEMA)
+
+    @classmethod
+    def for_target(cls, directory: pathlib.Path, base_url: str) -> 'CrawlCheckpoint':
+        """Открывает контрольную точку для цели; имя файла — хеш базового URL."""
+        digest = hashlib.sha1(base_url.encode('utf-8')).hexdigest()[:16]
+        return cls(pathlib.Path(directory) / f"{digest}.sqlite")
+
+    def has_state(self) -> bool:
+        """Есть ли в файле сохраненное состояние."""
+        return self._db.execute('SELECT 1 FROM crawled LIMIT 1').fetchone() is not None
+
+    def reset(self, base_url: str) -> None:
+        """Очищает состояние перед новым (не возобновляемым) сканированием."""
+        with self._db:
+            for table in ('meta', 'frontier', 'crawled', 'data', 'messages'):
+                self._db.execute(f'DELETE FROM {table}')
+            self._db.execute('INSERT INTO meta VALUES (?, ?)', ('base_url', base_url))
+
+    def save(
+            self,
+            frontier: list[tuple[str, int]],
+            new_crawled: list[str],
+            new_data: list[tuple[str, str]],
+            messages: dict[str, str]
+    ) -> None:
+        """Сохраняет фронтир целиком и дописывает новые посещенные URL и данные одной транзакцией."""
+        with self._db:
+            self._db.execute('DELETE FROM frontier')
+            self._db.executemany(
+                'INSERT INTO frontier (url, depth) VALUES (?, ?)', frontier
+            )
+            self._db.executemany('INSERT OR IGNORE INTO crawled VALUES (?)', ((url,) for url in new_crawled))
+            self._db.executemany('INSERT OR IGNORE INTO data VALUES (?, ?)', new_data)
+            self._db.executemany(
+                'INSERT OR REPLACE INTO messages VALUES (?, ?)',
+                ((key, json.dumps(value, ensure_ascii=False)) for key, value in messages.items())
+            )
+
+    def load(self) -> tuple[list[tuple[str, int]], list[str], list[tuple[str, str]], dict[str, str]]:
+        """Возвращает фронтир, посещенные URL, данные (в порядке записи) и сообщения."""
+        frontier = self._db.execute('SELECT url, depth FROM frontier ORDER BY position').fetchall()
+        crawled = [row[0] for row in self._db.execute('SELECT url FROM crawled')]
+        data = self._db.execute('SELECT kind, value FROM data ORDER BY rowid').fetchall()
+        messages = {key: json.loads(value) for key, value in self._db.execute('SELECT key, value FROM messages')}
+        return frontier, crawled, data, messages
+
+    def remove(self) -> None:
+        """Удаляет файл контрольной точки после полностью завершенного сканирования."""
+        self.close()
+        for suffix in ('', '-wal', '-shm'):
+            pathlib.Path(f"{self.path}{suffix}").unlink(missing_ok=True)
+
+    def close(self) -> None:
+        """Закрывает соединение с базой."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
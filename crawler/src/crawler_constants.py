@@ -22,6 +22,29 @@ FILE_EXTENSIONS = [
 MAIN_DIR: Final[pathlib.Path] = pathlib.Path(__file__).parents[2]
 TARGET_FILE: Final[pathlib.Path] = MAIN_DIR / "targets.txt"
 
+USER_AGENT: Final[str] = 'Mozilla/4.0 (compatible; MSIE 5.5; Windows NT 5.0)'
+DEFAULT_CONCURRENCY: Final[int] = 20
+DEFAULT_PER_HOST_LIMIT: Final[int] = 8
+DEFAULT_CONNECTION_BUDGET: Final[int] = 200
+DEFAULT_PARALLEL_TARGETS: Final[int] = 10
+PAGE_TIMEOUT: Final[int] = 5
+FILE_TIMEOUT: Final[int] = 50
+MAX_PAGE_BYTES: Final[int] = 2 * 1024 * 1024
+READ_CHUNK_SIZE: Final[int] = 64 * 1024
+STREAM_FLUSH_INTERVAL: Final[float] = 2.0
+STREAM_BUFFER_RECORDS: Final[int] = 500
+CHECKPOINT_DIR: Final[pathlib.Path] = MAIN_DIR / "checkpoints"
+CHECKPOINT_INTERVAL: Final[float] = 30.0
+VISITED_SET_TYPES: Final[tuple[str, ...]] = ('set', 'fingerprint', 'bloom')
+DEFAULT_BLOOM_ERROR_RATE: Final[float] = 1e-4
+DIRECTORY_CHECK_WORKERS: Final[int] = 4
+DIRECTORY_CHECK_BYTES: Final[int] = 64 * 1024
+INDEX_MARKER: Final[bytes] = b'Index of'
+DOWNLOAD_WORKERS: Final[int] = 4
+MAX_FILE_BYTES: Final[int] = 100 * 1024 * 1024
+PROGRESS_INTERVAL: Final[float] = 10.0
+LATENCY_SAMPLES: Final[int] = 1000
+
 message_links = "No links found on the website"
 message_directories = "No directories discovered during the scan"
 message_files = "No downloadable files were identified"
@@ -1,18 +1,26 @@
+import asyncio
 import logging
-import os
-from urllib.parse import urlparse
+import pathlib
+import time
+from collections import deque
+from typing import Callable
+from urllib.parse import urlsplit
 
-import requests
-from bs4 import BeautifulSoup
+import aiohttp
 
 from crawler.src.crawler_constants import FILE_EXTENSIONS, message_links, message_directories, message_files, \
-    message_emails, message_externals, message_directories_with_indexing
+    message_emails, message_externals, message_directories_with_indexing, USER_AGENT, DEFAULT_CONCURRENCY, \
+    DEFAULT_PER_HOST_LIMIT, PAGE_TIMEOUT, MAX_PAGE_BYTES, READ_CHUNK_SIZE, CHECKPOINT_INTERVAL, \
+    DEFAULT_BLOOM_ERROR_RATE, DIRECTORY_CHECK_WORKERS, DOWNLOAD_WORKERS, MAX_FILE_BYTES, PROGRESS_INTERVAL
+from crawler.src.crawler_checkpoint import CrawlCheckpoint
+from crawler.src.crawler_downloads import DownloadManager
+from crawler.src.crawler_metrics import CrawlMetrics
+from crawler.src.crawler_parser import PageExtractor
+from crawler.src.crawler_visited import make_visited_set, FingerprintSet
 from crawler.src.crawler_utils import (
-    normalize_url,
     extract_directories,
     check_directory_indexing,
-    extract_emails,
-    is_file_url
+    UrlClassifier
 )
 
 # Настройка логирования
@@ -20,7 +28,7 @@ logger = logging.getLogger(__name__)
 
 
 class Crawler:
-    """Класс для сканирования веб-сайта."""
+    """Класс для асинхронного сканирования веб-сайта."""
 
     ALLOW_SUBDOMAINS = False
 
@@ -32,9 +40,27 @@ class Crawler:
             subdomains: bool = False,
             follow_redirects: bool = True,
             extensions: list[str] = None,
-            exclude_extensions: list[str] = None
+            exclude_extensions: list[str] = None,
+            concurrency: int = DEFAULT_CONCURRENCY,
+            per_host_limit: int = DEFAULT_PER_HOST_LIMIT,
+            max_page_bytes: int = MAX_PAGE_BYTES,
+            on_record: Callable[[str, str], None] | None = None,
+            checkpoint_dir: pathlib.Path | None = None,
+            resume: bool = False,
+            visited: str = 'set',
+            bloom_error_rate: float = DEFAULT_BLOOM_ERROR_RATE,
+            download_workers: int = DOWNLOAD_WORKERS,
+            max_file_bytes: int = MAX_FILE_BYTES,
+            progress_interval: float = PROGRESS_INTERVAL
     ):
-        """Инициализация краулера."""
+        """Инициализация краулера.
+
+        visited задает хранение посещенных URL: 'set' (строки), 'fingerprint'
+        (64-битные отпечатки) или 'bloom' (фильтр Блума на max_urls элементов).
+        Компактными становятся множество посещенных и индексы дубликатов; сами строки
+        URL по-прежнему хранятся во фронтире to_crawl и в списках результатов self.data,
+        так что память экономится на посещенных страницах, а не на найденных ссылках.
+        """
         self.base_url = self._normalize_base_url(base_url)
         self.max_urls = max_urls
         self.fetch_files = fetch_files
@@ -42,6 +68,11 @@ class Crawler:
         self.follow_redirects = follow_redirects
         self.extensions = extensions if extensions else FILE_EXTENSIONS
         self.exclude_extensions = exclude_extensions if exclude_extensions else []
+        self.concurrency = max(1, concurrency)
+        self.per_host_limit = max(1, per_host_limit)
+        self.max_page_bytes = max_page_bytes
+        self.on_record = on_record
+        self.classifier = UrlClassifier(self.base_url, subdomains, self.exclude_extensions)
         self.data = {
             'links': [],
             'directories': [],
@@ -51,10 +82,38 @@ class Crawler:
             'directories_with_indexing': [],
             'messages': {}
         }
-        self.to_crawl = [(self.base_url, 0)]
-        self.crawled = set()
-        self.session = requests.Session()
-        self.session.headers.update({'User-Agent': 'Mozilla/4.0 (compatible; MSIE 5.5; Windows NT 5.0)'})
+        self.visited = visited
+        self.bloom_error_rate = bloom_error_rate
+        # Индексы для O(1) проверки дубликатов; списки в self.data сохраняют порядок обнаружения.
+        # В компактных режимах индексы хранят отпечатки: ложные срабатывания здесь теряли бы результаты
+        self._seen = {key: self._new_index() for key, value in self.data.items() if isinstance(value, list)}
+        self.to_crawl: deque[tuple[str, int]] = deque([(self.base_url, 0)])
+        # Индекс фронтира: строки URL уже лежат в to_crawl, второй копии в set не нужно
+        self._queued = self._new_index()
+        self._queued.add(self.base_url)
+        self.crawled = make_visited_set(visited, max_urls, bloom_error_rate)
+        self.session: aiohttp.ClientSession | None = None
+        # Выставляется, если обход прерван (Ctrl-C или отмена задачи): results() вернет частичный результат
+        self.interrupted = False
+        self._in_flight = 0
+        self._frontier_event: asyncio.Event | None = None
+        # Проверки индексации каталогов идут отдельной очередью и не задерживают обход страниц
+        self._directory_queue: asyncio.Queue[str] | None = None
+        self._directory_checks: dict[str, bool] = {}
+        # Файлы качаются в фоне и не держат воркеры обхода страниц
+        self.metrics = CrawlMetrics(self.base_url)
+        self.progress_interval = progress_interval
+        self.downloads = DownloadManager(
+            download_workers, max_file_bytes, follow_redirects, self.metrics
+        ) if fetch_files else None
+        # Контрольные точки: что добавилось с прошлого сохранения и какие URL сейчас в работе
+        self.checkpoint_dir = checkpoint_dir
+        self.resume = resume
+        self._checkpoint: CrawlCheckpoint | None = None
+        self._active: set[str] = set()
+        self._pending_crawled: list[str] = []
+        self._pending_data: list[tuple[str, str]] = []
+        self._last_checkpoint = time.monotonic()
 
     def _normalize_base_url(self, url: str) -> str:
         """Добавляет схему http, если отсутствует."""
@@ -62,139 +121,318 @@ class Crawler:
             url = 'http://' + url
         return url.rstrip('/')
 
-    def _fetch_file(self, url: str, directory: str) -> bool:
-        """Скачивает файл по URL в указанную папку."""
-        try:
-            response = self.session.get(url, timeout=50, allow_redirects=self.follow_redirects)
-            if response.status_code == 200:
-                filename = url.split('/')[-1]
-                filepath = os.path.join(directory, filename)
-                os.makedirs(directory, exist_ok=True)
-                with open(filepath, 'wb') as f:
-                    f.write(response.content)
-                logger.info(f"Файл скачан: {filepath}")
-                return True
-            else:
-                logger.debug(f"Ошибка скачивания {url}: {response.status_code}")
-                return False
-        except requests.RequestException as e:
-            logger.debug(f"Ошибка скачивания {url}: {e}")
+    def _add_unique(self, key: str, value: str) -> bool:
+        """Добавляет значение в self.data[key], если его там еще нет."""
+        seen = self._seen[key]
+        if value in seen:
+            return False
+        seen.add(value)
+        self.data[key].append(value)
+        if self._checkpoint:
+            self._pending_data.append((key, value))
+        if self.on_record:
+            self.on_record(key, value)
+        return True
+
+    def _new_index(self) -> set[str] | FingerprintSet:
+        """Точный индекс URL: set со строками или, в компактных режимах, множество отпечатков."""
+        return set() if self.visited == 'set' else FingerprintSet()
+
+    def _enqueue(self, url: str) -> bool:
+        """Добавляет URL во фронтир и будит ожидающих воркеров."""
+        if url in self.crawled or url in self._queued:
             return False
+        self._queued.add(url)
+        self.to_crawl.append((url, 0))
+        if self._frontier_event:
+            self._frontier_event.set()
+        return True
+
+    def _open_checkpoint(self) -> None:
+        """Открывает контрольную точку и, при --resume, восстанавливает из нее состояние."""
+        if not self.checkpoint_dir:
+            return
+        self._checkpoint = CrawlCheckpoint.for_target(self.checkpoint_dir, self.base_url)
+        if not (self.resume and self._checkpoint.has_state()):
+            self._checkpoint.reset(self.base_url)
+            return
+
+        frontier, crawled, data, messages = self._checkpoint.load()
+        self.to_crawl = deque(frontier)
+        self._queued = self._new_index()
+        self._queued.update(url for url, _ in frontier)
+        self.crawled = make_visited_set(self.visited, max(self.max_urls, len(crawled)), self.bloom_error_rate)
+        self.crawled.update(crawled)
+        for key, value in data:
+            if value not in self._seen[key]:
+                self._seen[key].add(value)
+                self.data[key].append(value)
+        self.data['messages'].update(messages)
+        logger.info(
+            f"Возобновление сканирования {self.base_url}: {len(self.crawled)} URL уже обработано, "
+            f"{len(self.to_crawl)} во фронтире"
+        )
 
-    def crawl_url(self, url: str) -> bool:
-        """Сканирует одну страницу и извлекает данные."""
-        if is_file_url(url):
-            if url not in self.data['files']:
-                self.data['files'].append(url)
+    def _save_checkpoint(self) -> None:
+        """Сохраняет фронтир (включая URL в работе) и все новое с прошлой контрольной точки."""
+        if not self._checkpoint:
+            return
+        frontier = [(url, 0) for url in self._active] + list(self.to_crawl)
+        self._checkpoint.save(frontier, self._pending_crawled, self._pending_data, self.data['messages'])
+        self._pending_crawled = []
+        self._pending_data = []
+        self._last_checkpoint = time.monotonic()
+
+    def _close_checkpoint(self) -> None:
+        """Финальное сохранение; файл удаляется, если сайт просканирован полностью."""
+        if not self._checkpoint:
+            return
+        self._save_checkpoint()
+        if not self.to_crawl and not self._active:
+            self._checkpoint.remove()
+        else:
+            self._checkpoint.close()
+            logger.info("Состояние сканирования сохранено, продолжить можно с --resume")
+        self._checkpoint = None
+
+    async def crawl_url(self, url: str) -> bool:
+        """Скачивает одну страницу и извлекает из нее данные."""
+        if self.classifier.is_file(url):
+            if self._add_unique('files', url):
                 logger.debug(f"Найден файл: {url}")
-            if self.fetch_files and not any(url.endswith(ext) for ext in self.exclude_extensions):
-                parsed = urlparse(self.base_url)
-                domain = parsed.netloc.replace('www.', '').split(':')[0]
-                directory = os.path.join(domain, 'Files')
-                self._fetch_file(url, directory)
+            if self.fetch_files and not self.classifier.is_excluded(url):
+                self.downloads.submit(url, self.classifier.base_files_directory)
             return False
 
+        files_to_fetch = []
+        started = time.perf_counter()
         try:
-            response = self.session.get(
-                url.replace(' ', '%20'),
-                timeout=5,
-                allow_redirects=self.follow_redirects
-            )
-            if response.status_code != 200 or 'text/html' not in response.headers.get('Content-Type', ''):
-                if response.status_code in (301, 302) and self.follow_redirects:
-                    redirect_url = response.headers.get('Location')
-                    if redirect_url:
-                        normalized = normalize_url(redirect_url, self.base_url, allow_subdomains=self.ALLOW_SUBDOMAINS)
-                        if normalized and normalized not in self.crawled:
-                            self.to_crawl.append((normalized, 0))
-                            logger.debug(f"Редирект на: {normalized}")
-                logger.debug(f"Пропуск {url}: код {response.status_code} или не HTML")
-                return False
-
-            soup = BeautifulSoup(response.text, 'html.parser')
-            self.data['emails'].extend(extract_emails(response.text))
-            self.data['emails'] = list(set(self.data['emails']))
-
-            for link in soup.find_all(['a', 'iframe', 'img'], href=True):
-                href = link.get('href')
-                normalized = normalize_url(href, url, allow_subdomains=self.ALLOW_SUBDOMAINS)
-                if not normalized:
-                    continue
-                parsed = urlparse(normalized)
-                if parsed.netloc == urlparse(self.base_url).netloc or (
-                        self.ALLOW_SUBDOMAINS and urlparse(self.base_url).netloc in parsed.netloc
-                ):
-                    if is_file_url(normalized):
-                        if normalized not in self.data['files']:
-                            self.data['files'].append(normalized)
-                            if self.fetch_files and not any(
-                                    normalized.endswith(ext) for ext in self.exclude_extensions):
-                                domain = parsed.netloc.replace('www.', '').split(':')[0]
-                                directory = os.path.join(domain, 'Files')
-                                self._fetch_file(normalized, directory)
-                    else:
-                        if normalized not in self.data['links']:
-                            self.data['links'].append(normalized)
-                        if normalized not in self.crawled and normalized not in [x[0] for x in self.to_crawl]:
-                            self.to_crawl.append((normalized, 0))
-                            logger.debug(f"Добавлена ссылка: {normalized}")
-                else:
-                    if normalized not in self.data['externals']:
-                        self.data['externals'].append(normalized)
-                        logger.debug(f"Найдена внешняя ссылка: {normalized}")
-
-            directories = extract_directories(url)
-            for directory in directories:
-                if directory not in self.data['directories']:
-                    self.data['directories'].append(directory)
-                    if check_directory_indexing(directory):
-                        self.data['directories_with_indexing'].append(directory)
-                        logger.info(f"Найден каталог с индексацией: {directory}")
-            return True
-
-        except requests.RequestException as e:
+            async with self.session.get(
+                    url.replace(' ', '%20'),
+                    # Как timeout у requests: лимит на подключение и на каждое чтение, а не на всю страницу
+                    timeout=aiohttp.ClientTimeout(total=None, sock_connect=PAGE_TIMEOUT, sock_read=PAGE_TIMEOUT),
+                    allow_redirects=self.follow_redirects
+            ) as response:
+                self.metrics.observe_response(urlsplit(url).netloc, time.perf_counter() - started, response.status)
+                if response.status != 200 or 'text/html' not in response.headers.get('Content-Type', ''):
+                    if response.status in (301, 302) and self.follow_redirects:
+                        redirect_url = response.headers.get('Location')
+                        if redirect_url:
+                            normalized = self.classifier.normalize(
+                                redirect_url, self.base_url, self.classifier.base_netloc
+                            )
+                            if normalized and self._enqueue(normalized):
+                                self.metrics.redirects += 1
+                                logger.debug(f"Редирект на: {normalized}")
+                    logger.debug(f"Пропуск {url}: код {response.status} или не HTML")
+                    return False
+                extractor = PageExtractor(response.charset, self.max_page_bytes)
+                page_bytes, parse_seconds = 0, 0.0
+                async for chunk in response.content.iter_chunked(READ_CHUNK_SIZE):
+                    page_bytes += len(chunk)
+                    parse_started = time.perf_counter()
+                    within_limit = extractor.feed_bytes(chunk)
+                    files_to_fetch.extend(self._process_extracted(url, *extractor.drain()))
+                    parse_seconds += time.perf_counter() - parse_started
+                    if not within_limit:
+                        logger.debug(f"Страница {url} обрезана по лимиту {self.max_page_bytes} байт")
+                        break
+                parse_started = time.perf_counter()
+                extractor.close()
+                files_to_fetch.extend(self._process_extracted(url, *extractor.drain()))
+                self.metrics.observe_page(page_bytes, parse_seconds + time.perf_counter() - parse_started)
+        except (aiohttp.ClientError, asyncio.TimeoutError, UnicodeDecodeError) as e:
             logger.debug(f"Ошибка сканирования {url}: {e}")
-            self.data['messages'][f"error_{url}"] = str(e)
-            return False
-        except KeyboardInterrupt:
-            logger.info("Прерывание пользователем при сканировании URL")
+            self.metrics.error(type(e).__name__)
+            self.data['messages'][f"error_{url}"] = str(e) or type(e).__name__
             return False
 
-    def crawl_site(self) -> dict:
-        """Запускает сканирование сайта."""
-        logger.info(f"Начало сканирования: {self.base_url}")
+        new_directories = [
+            directory for directory in extract_directories(url) if self._add_unique('directories', directory)
+        ]
+
+        for file_url, directory in files_to_fetch:
+            self.downloads.submit(file_url, directory)
+
+        for directory in new_directories:
+            self._directory_queue.put_nowait(directory)
+        return True
+
+    def _process_extracted(self, url: str, links: list[str], emails: list[str]) -> list[tuple[str, str]]:
+        """Раскладывает ссылки и email-адреса очередного чанка страницы по self.data.
+
+        Возвращает файлы, которые нужно скачать.
+        """
+        files_to_fetch = []
+        for email in emails:
+            self._add_unique('emails', email)
+
+        classifier = self.classifier
+        page_netloc = urlsplit(url).netloc
+        for href in links:
+            normalized, kind, directory = classifier.classify(href, url, page_netloc)
+            if kind == UrlClassifier.FILE:
+                if self._add_unique('files', normalized):
+                    if self.fetch_files and not classifier.is_excluded(normalized):
+                        files_to_fetch.append((normalized, directory))
+            elif kind == UrlClassifier.LINK:
+                self._add_unique('links', normalized)
+                if self._enqueue(normalized):
+                    logger.debug(f"Добавлена ссылка: {normalized}")
+            elif kind == UrlClassifier.EXTERNAL:
+                if self._add_unique('externals', normalized):
+                    logger.debug(f"Найдена внешняя ссылка: {normalized}")
+        return files_to_fetch
+
+    async def _worker(self) -> None:
+        """Воркер: забирает URL из общего фронтира, пока есть работа и не исчерпан лимит."""
+        while True:
+            if len(self.crawled) >= self.max_urls:
+                self._frontier_event.set()
+                return
+            if not self.to_crawl:
+                if self._in_flight == 0:
+                    # Фронтир пуст и никто не может его пополнить — работа закончена
+                    self._frontier_event.set()
+                    return
+                self._frontier_event.clear()
+                await self._frontier_event.wait()
+                continue
+
+            url, _ = self.to_crawl.popleft()
+            self._queued.discard(url)
+            if url in self.crawled:
+                continue
+            logger.debug(f"Сканирование URL: {url}")
+            self.crawled.add(url)
+            self._active.add(url)
+            self._in_flight += 1
+            completed = False
+            try:
+                await self.crawl_url(url)
+                completed = True
+            except Exception as e:
+                logger.debug(f"Необработанная ошибка при сканировании {url}: {e}")
+                self.data['messages'][f"error_{url}"] = str(e)
+                self.metrics.error(type(e).__name__)
+                completed = True
+            finally:
+                self._in_flight -= 1
+                self._active.discard(url)
+                if completed:
+                    if self._checkpoint:
+                        self._pending_crawled.append(url)
+                else:
+                    # Прерванный URL возвращается во фронтир, чтобы его можно было докачать при --resume
+                    self.crawled.discard(url)
+                    self._queued.add(url)
+                    self.to_crawl.appendleft((url, 0))
+                if self._checkpoint and time.monotonic() - self._last_checkpoint >= CHECKPOINT_INTERVAL:
+                    self._save_checkpoint()
+                self._frontier_event.set()
+
+    async def _directory_worker(self) -> None:
+        """Воркер очереди проверок индексации каталогов."""
+        while True:
+            directory = await self._directory_queue.get()
+            try:
+                if directory not in self._directory_checks:
+                    self._directory_checks[directory] = await check_directory_indexing(self.session, directory)
+                if self._directory_checks[directory]:
+                    self._add_unique('directories_with_indexing', directory)
+                    logger.info(f"Найден каталог с индексацией: {directory}")
+            except Exception as e:
+                logger.debug(f"Необработанная ошибка при проверке каталога {directory}: {e}")
+            finally:
+                self._directory_queue.task_done()
+
+    async def _report_progress(self) -> None:
+        """Периодически обновляет метрики-датчики и пишет строку прогресса в лог."""
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            self.metrics.set_gauges(len(self.to_crawl), self._in_flight)
+            logger.info(f"Прогресс {self.metrics.progress_line()}")
+
+    async def _run_workers(self, session: aiohttp.ClientSession) -> None:
+        """Прогоняет пул воркеров по фронтиру в рамках переданной сессии."""
+        self.session = session
+        self._directory_queue = asyncio.Queue()
+        if self.downloads:
+            self.downloads.start(session)
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        background_tasks = [
+            asyncio.create_task(self._directory_worker())
+            for _ in range(min(DIRECTORY_CHECK_WORKERS, self.concurrency))
+        ]
+        if self.progress_interval > 0:
+            background_tasks.append(asyncio.create_task(self._report_progress()))
         try:
-            while self.to_crawl and len(self.crawled) < self.max_urls:
-                url, _ = self.to_crawl.pop(0)
-                if url in self.crawled:
-                    continue
-                logger.debug(f"Сканирование URL: {url}")
-                self.crawled.add(url)
-                self.crawl_url(url)
-        except KeyboardInterrupt:
+            await asyncio.gather(*workers)
+            # Страницы обойдены — дожидаемся оставшихся проверок каталогов и загрузок
+            await self._directory_queue.join()
+            if self.downloads:
+                await self.downloads.join()
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            # Отмена пробрасывается дальше после уборки в finally: вызывающий код (asyncio.timeout,
+            # TaskGroup, main) должен ее увидеть; собранное доступно через results()
+            self.interrupted = True
             logger.info("Сканирование прервано пользователем")
+            raise
+        finally:
+            for worker in workers + background_tasks:
+                worker.cancel()
+            await asyncio.gather(*workers, *background_tasks, return_exceptions=True)
+            self.metrics.set_gauges(len(self.to_crawl), self._in_flight)
+            if self.downloads:
+                await self.downloads.close()
+            self.session = None
 
-        self.data['links'] = sorted(set(self.data['links']))
-        self.data['directories'] = sorted(set(self.data['directories']))
-        self.data['files'] = sorted(set(self.data['files']))
-        self.data['externals'] = sorted(set(self.data['externals']))
-        self.data['directories_with_indexing'] = sorted(set(self.data['directories_with_indexing']))
-        self.data['emails'] = sorted(set(self.data['emails']))
-
-        if not self.data['links']:
-            self.data['messages']['message_links'] = message_links
-        if not self.data['directories']:
-            self.data['messages']['message_directories'] = message_directories
-        if not self.data['files']:
-            self.data['messages']['message_files'] = message_files
-        if not self.data['emails']:
-            self.data['messages']['message_emails'] = message_emails
-        if not self.data['externals']:
-            self.data['messages']['message_externals'] = message_externals
-        if not self.data['directories_with_indexing']:
-            self.data['messages']['message_directories_with_indexing'] = message_directories_with_indexing
-
-        self.data = {k: v for k, v in self.data.items() if not isinstance(v, list) or v}
+    async def crawl_site(self, session: aiohttp.ClientSession | None = None) -> dict:
+        """Запускает сканирование сайта пулом асинхронных воркеров.
+
+        Если передана сессия, краулер работает в ее пуле соединений (общий бюджет
+        для нескольких целей), иначе создает собственную. При отмене состояние
+        сохраняется в контрольную точку, CancelledError пробрасывается, а собранное
+        к этому моменту возвращает results().
+        """
+        logger.info(f"Начало сканирования: {self.base_url}")
+        self._frontier_event = asyncio.Event()
+        self._open_checkpoint()
+        try:
+            if session is not None:
+                await self._run_workers(session)
+            else:
+                connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host_limit)
+                async with aiohttp.ClientSession(
+                        connector=connector, headers={'User-Agent': USER_AGENT}
+                ) as own_session:
+                    await self._run_workers(own_session)
+        finally:
+            self._close_checkpoint()
 
         logger.info(f"Сканирование завершено: {len(self.crawled)} URL обработано")
-        return self.data
+        logger.info(f"Итог {self.metrics.progress_line()}")
+        return self.results()
+
+    def results(self) -> dict:
+        """Итоговые данные: отсортированные списки без повторов и сообщения о пустых категориях.
+
+        self.data не меняется, поэтому метод годится и для частичных результатов
+        прерванного обхода.
+        """
+        data = {key: sorted(set(value)) if isinstance(value, list) else dict(value) for key, value in self.data.items()}
+
+        if not data['links']:
+            data['messages']['message_links'] = message_links
+        if not data['directories']:
+            data['messages']['message_directories'] = message_directories
+        if not data['files']:
+            data['messages']['message_files'] = message_files
+        if not data['emails']:
+            data['messages']['message_emails'] = message_emails
+        if not data['externals']:
+            data['messages']['message_externals'] = message_externals
+        if not data['directories_with_indexing']:
+            data['messages']['message_directories_with_indexing'] = message_directories_with_indexing
+
+        return {k: v for k, v in data.items() if not isinstance(v, list) or v}
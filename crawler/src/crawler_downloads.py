@@ -0,0 +1,253 @@
+import asyncio
+import hashlib
+import logging
+import os
+import pathlib
+import threading
+from urllib.parse import urlparse, unquote
+
+import aiohttp
+
+from crawler.src.crawler_metrics import CrawlMetrics
+from crawler.src.crawler_constants import DOWNLOAD_WORKERS, MAX_FILE_BYTES, FILE_TIMEOUT, PAGE_TIMEOUT, \
+    READ_CHUNK_SIZE
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+
+class FileTooLarge(Exception):
+    """Файл превысил лимит размера."""
+
+
+class DownloadManager:
+    """Фоновое скачивание файлов собственным пулом воркеров.
+
+    Файлы пишутся на диск потоком через временный .part-файл, поэтому память не
+    зависит от их размера. Прерванная загрузка докачивается Range-запросом с
+    If-Range: рядом с .part хранится ETag или Last-Modified ответа, и если файл на
+    сервере изменился, он скачивается заново, а не склеивается из двух версий.
+    Один и тот же URL скачивается один раз, а файл с уже сохраненным содержимым
+    (по SHA-256) повторно не записывается.
+    """
+
+    def __init__(
+            self,
+            workers: int = DOWNLOAD_WORKERS,
+            max_file_bytes: int = MAX_FILE_BYTES,
+            follow_redirects: bool = True,
+            metrics: CrawlMetrics | None = None
+    ):
+        self.workers = max(1, workers)
+        self.metrics = metrics
+        self.max_file_bytes = max_file_bytes
+        self.follow_redirects = follow_redirects
+        self.session: aiohttp.ClientSession | None = None
+        self._queue: asyncio.Queue[tuple[str, pathlib.Path]] | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._submitted: set[str] = set()
+        self._hashes: dict[str, pathlib.Path] = {}
+        self._indexed: set[pathlib.Path] = set()
+        # _finalize выполняется в потоках: выбор имени, os.replace и учет хешей не должны перемешиваться
+        self._finalize_lock = threading.Lock()
+
+    def start(self, session: aiohttp.ClientSession) -> None:
+        """Запускает воркеры в рамках сессии краулера."""
+        self.session = session
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def submit(self, url: str, directory: str) -> bool:
+        """Ставит файл в очередь на скачивание; повторные URL игнорируются."""
+        if url in self._submitted:
+            return False
+        self._submitted.add(url)
+        self._queue.put_nowait((url, pathlib.Path(directory)))
+        return True
+
+    async def join(self) -> None:
+        """Ждет, пока очередь загрузок опустеет."""
+        await self._queue.join()
+
+    async def close(self) -> None:
+        """Останавливает воркеры; недокачанные .part-файлы остаются для докачки."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.session = None
+
+    async def _worker(self) -> None:
+        while True:
+            url, directory = await self._queue.get()
+            try:
+                await self._download(url, directory)
+            except Exception as e:
+                logger.debug(f"Необработанная ошибка при скачивании {url}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _index_directory(self, directory: pathlib.Path) -> None:
+        """Запоминает хеши файлов, уже лежащих в каталоге (от прошлых запусков)."""
+        if directory in self._indexed:
+            return
+        self._indexed.add(directory)
+        for path in directory.iterdir():
+            if path.is_file() and not path.name.endswith(('.part', '.validator')):
+                self._hashes.setdefault(_file_digest(path).hexdigest(), path)
+
+    async def _download(self, url: str, directory: pathlib.Path) -> bool:
+        """Скачивает файл в directory, докачивая прерванную загрузку, если она есть."""
+        directory.mkdir(parents=True, exist_ok=True)
+        await asyncio.to_thread(self._index_directory, directory)
+        part = directory / f".{hashlib.sha1(url.encode('utf-8')).hexdigest()}.part"
+        validator_file = part.with_suffix('.validator')
+        offset = part.stat().st_size if part.exists() else 0
+        validator = validator_file.read_text().strip() if offset and validator_file.exists() else None
+        restart = False
+        digest: str | None = None
+        # Без валидатора нельзя убедиться, что файл на сервере не изменился, поэтому качаем с начала
+        headers = {'Range': f'bytes={offset}-', 'If-Range': validator} if validator else {}
+
+        try:
+            async with self.session.get(
+                    url.replace(' ', '%20'),
+                    headers=headers,
+                    timeout=aiohttp.ClientTimeout(total=None, sock_connect=PAGE_TIMEOUT, sock_read=FILE_TIMEOUT),
+                    allow_redirects=self.follow_redirects
+            ) as response:
+                if response.status == 416 and validator and _content_range_total(response) == offset:
+                    # Сервер считает, что докачивать нечего: .part уже содержит весь файл
+                    digest = (await asyncio.to_thread(_file_digest, part)).hexdigest()
+                elif (response.status == 206 and validator and _response_validator(response) == validator
+                      and _content_range_start(response) == offset):
+                    # Валидатор сверяется и здесь: не все серверы учитывают If-Range
+                    digest = await self._write_body(response, part, offset)
+                elif response.status == 200:
+                    # Range не поддерживается, .part нет или файл на сервере изменился — качаем с начала
+                    offset = 0
+                    validator = _response_validator(response)
+                    if validator:
+                        validator_file.write_text(validator)
+                    else:
+                        validator_file.unlink(missing_ok=True)
+                    digest = await self._write_body(response, part, 0)
+                elif response.status in (206, 416) and validator:
+                    # Файл на сервере изменился или ответ не продолжает .part — качаем заново без Range
+                    logger.debug(f"Докачка {url} невозможна ({response.status}), скачиваем с начала")
+                    part.unlink(missing_ok=True)
+                    validator_file.unlink(missing_ok=True)
+                    restart = True
+                else:
+                    logger.debug(f"Ошибка скачивания {url}: {response.status}")
+                    return False
+        except FileTooLarge:
+            logger.info(f"Файл {url} пропущен: больше {self.max_file_bytes} байт")
+            part.unlink(missing_ok=True)
+            validator_file.unlink(missing_ok=True)
+            return False
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            logger.debug(f"Ошибка скачивания {url} (докачается при следующем запуске): {e}")
+            return False
+
+        if restart:
+            return await self._download(url, directory)
+        validator_file.unlink(missing_ok=True)
+        return await asyncio.to_thread(self._finalize, url, part, directory, digest)
+
+    async def _write_body(self, response: aiohttp.ClientResponse, part: pathlib.Path, offset: int) -> str:
+        """Пишет тело ответа в .part-файл потоком, следя за лимитом размера; возвращает SHA-256 файла.
+
+        Запись на диск и хеширование идут в потоке, чтобы медленный диск не задерживал
+        цикл событий с воркерами страниц. Хеш считается по ходу скачивания (при докачке —
+        начиная с уже записанной части), поэтому файл не перечитывается целиком.
+        """
+        length = response.content_length
+        if self.max_file_bytes and length is not None and offset + length > self.max_file_bytes:
+            raise FileTooLarge()
+        digest = await asyncio.to_thread(_file_digest, part) if offset else hashlib.sha256()
+        written = offset
+        # Мелкие чанки из сети копятся до READ_CHUNK_SIZE, чтобы не переключаться в поток на каждый
+        pending = bytearray()
+        f = await asyncio.to_thread(open, part, 'ab' if offset else 'wb')
+        try:
+            async for chunk in response.content.iter_chunked(READ_CHUNK_SIZE):
+                written += len(chunk)
+                if self.max_file_bytes and written > self.max_file_bytes:
+                    raise FileTooLarge()
+                pending += chunk
+                if len(pending) >= READ_CHUNK_SIZE:
+                    await asyncio.to_thread(_write_chunk, f, digest, bytes(pending))
+                    pending.clear()
+                if self.metrics:
+                    self.metrics.file_bytes += len(chunk)
+            if pending:
+                await asyncio.to_thread(_write_chunk, f, digest, bytes(pending))
+        finally:
+            await asyncio.to_thread(f.close)
+        return digest.hexdigest()
+
+    def _finalize(self, url: str, part: pathlib.Path, directory: pathlib.Path, digest: str) -> bool:
+        """Переносит .part на место, если такого содержимого еще нет."""
+        name = unquote(urlparse(url).path.rstrip('/').split('/')[-1]).replace('/', '_')
+        if name in ('', '.', '..'):
+            name = 'index'
+        with self._finalize_lock:
+            existing = self._hashes.get(digest)
+            if existing is not None and existing.exists():
+                part.unlink()
+                logger.debug(f"Файл {url} совпадает с уже скачанным {existing}")
+                return False
+
+            target = directory / name
+            if target.exists():
+                # Тот же путь, другое содержимое — различаем по префиксу хеша
+                target = directory / f"{target.stem}-{digest[:8]}{target.suffix}"
+            os.replace(part, target)
+            self._hashes[digest] = target
+        logger.info(f"Файл скачан: {target}")
+        return True
+
+
+def _response_validator(response: aiohttp.ClientResponse) -> str | None:
+    """Валидатор для If-Range: сильный ETag, иначе Last-Modified.
+
+    Слабый ETag (W/...) не гарантирует побайтового совпадения и для If-Range не годится.
+    """
+    etag = response.headers.get('ETag')
+    return etag if etag and not etag.startswith('W/') else response.headers.get('Last-Modified')
+
+
+def _content_range(response: aiohttp.ClientResponse) -> tuple[str, str]:
+    """Диапазон и полный размер из Content-Range ('bytes 100-999/1000' -> ('100-999', '1000'))."""
+    value = response.headers.get('Content-Range', '')
+    unit, _, rest = value.partition(' ')
+    span, _, total = rest.partition('/')
+    return (span, total) if unit == 'bytes' else ('', '')
+
+
+def _content_range_start(response: aiohttp.ClientResponse) -> int | None:
+    """Первый байт частичного ответа 206 или None, если заголовок не разобрать."""
+    start = _content_range(response)[0].partition('-')[0]
+    return int(start) if start.isdigit() else None
+
+
+def _content_range_total(response: aiohttp.ClientResponse) -> int | None:
+    """Полный размер файла из ответа 416 ('bytes */1000') или None."""
+    total = _content_range(response)[1]
+    return int(total) if total.isdigit() else None
+
+
+def _write_chunk(f, digest, chunk: bytes) -> None:
+    """Дописывает чанк в файл и в хеш; выполняется в потоке."""
+    f.write(chunk)
+    digest.update(chunk)
+
+
+def _file_digest(path: pathlib.Path):
+    """SHA-256 файла, читаемого по частям; объект хеша можно продолжать при докачке."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(READ_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest
@@ -0,0 +1,162 @@
+import logging
+import os
+import pathlib
+import time
+from collections import Counter, defaultdict, deque
+
+from crawler.src.crawler_constants import LATENCY_SAMPLES
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def _percentile(samples: list[float], quantile: float) -> float:
+    """Перцентиль по отсортированной выборке (ближайший ранг)."""
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(quantile * len(samples)))]
+
+
+def _label(value: str) -> str:
+    """Экранирует значение метки для текстового формата Prometheus."""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class CrawlMetrics:
+    """Живые метрики одного сканирования.
+
+    Задержки хранятся скользящим окном из LATENCY_SAMPLES последних ответов на хост,
+    так что память не растет с числом страниц, а перцентили отражают текущее состояние.
+    """
+
+    def __init__(self, target: str):
+        self.target = target
+        self.started = time.monotonic()
+        self.pages = 0
+        self.bytes = 0
+        self.file_bytes = 0
+        self.parse_seconds = 0.0
+        self.statuses: Counter[int] = Counter()
+        self.errors: Counter[str] = Counter()
+        self.redirects = 0
+        self.frontier_size = 0
+        self.in_flight = 0
+        self._latencies: defaultdict[str, deque[float]] = defaultdict(lambda: deque(maxlen=LATENCY_SAMPLES))
+        self._latency_totals: defaultdict[str, list[float]] = defaultdict(lambda: [0, 0.0])
+        self._last_pages = 0
+        self._last_report = self.started
+
+    def observe_response(self, host: str, latency: float, status: int) -> None:
+        """Время до заголовков ответа и код статуса."""
+        self._latencies[host].append(latency)
+        totals = self._latency_totals[host]
+        totals[0] += 1
+        totals[1] += latency
+        self.statuses[status] += 1
+
+    def observe_page(self, size: int, parse_seconds: float) -> None:
+        """Разобранная HTML-страница: прочитанные байты и время разбора."""
+        self.pages += 1
+        self.bytes += size
+        self.parse_seconds += parse_seconds
+
+    def error(self, kind: str) -> None:
+        self.errors[kind] += 1
+
+    def set_gauges(self, frontier_size: int, in_flight: int) -> None:
+        self.frontier_size = frontier_size
+        self.in_flight = in_flight
+
+    def pages_per_second(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.pages / elapsed if elapsed > 0 else 0.0
+
+    def latency_percentiles(self, host: str | None = None) -> dict[float, float]:
+        """Перцентили задержки по хосту или по всем хостам вместе."""
+        if host is not None:
+            samples = sorted(self._latencies.get(host, ()))
+        else:
+            samples = sorted(latency for latencies in self._latencies.values() for latency in latencies)
+        return {quantile: _percentile(samples, quantile) for quantile in QUANTILES}
+
+    def progress_line(self) -> str:
+        """Строка для периодического лога; скорость считается и за весь запуск, и за последний интервал."""
+        now = time.monotonic()
+        interval = now - self._last_report
+        recent_rate = (self.pages - self._last_pages) / interval if interval > 0 else 0.0
+        self._last_pages, self._last_report = self.pages, now
+        latency = self.latency_percentiles()
+        p50, p90, p99 = (latency[quantile] * 1000 for quantile in QUANTILES)
+        parse_ms = self.parse_seconds / self.pages * 1000 if self.pages else 0.0
+        return (
+            f"{self.target}: {self.pages} стр. ({recent_rate:.1f}/с сейчас, "
+            f"{self.pages_per_second():.1f}/с в среднем), фронтир {self.frontier_size}, в работе {self.in_flight}, "
+            f"{(self.bytes + self.file_bytes) / 1024 / 1024:.1f} МБ, ошибок {sum(self.errors.values())}, "
+            f"задержка p50/p90/p99 {p50:.0f}/{p90:.0f}/{p99:.0f} мс, разбор {parse_ms:.1f} мс/стр."
+        )
+
+    def render_prometheus(self) -> str:
+        """Метрики в текстовом формате Prometheus (без строк HELP/TYPE, их добавляет write_prometheus)."""
+        target = f'target="{_label(self.target)}"'
+        lines = [
+            f'crawler_pages_total{{{target}}} {self.pages}',
+            f'crawler_page_bytes_total{{{target}}} {self.bytes}',
+            f'crawler_file_bytes_total{{{target}}} {self.file_bytes}',
+            f'crawler_parse_seconds_total{{{target}}} {self.parse_seconds:.6f}',
+            f'crawler_redirects_total{{{target}}} {self.redirects}',
+            f'crawler_frontier_size{{{target}}} {self.frontier_size}',
+            f'crawler_in_flight{{{target}}} {self.in_flight}',
+            f'crawler_pages_per_second{{{target}}} {self.pages_per_second():.3f}',
+        ]
+        lines += [f'crawler_responses_total{{{target},status="{status}"}} {count}'
+                  for status, count in sorted(self.statuses.items())]
+        lines += [f'crawler_errors_total{{{target},kind="{_label(kind)}"}} {count}'
+                  for kind, count in sorted(self.errors.items())]
+        for host in sorted(self._latencies):
+            labels = f'{target},host="{_label(host)}"'
+            for quantile, value in self.latency_percentiles(host).items():
+                lines.append(f'crawler_response_latency_seconds{{{labels},quantile="{quantile}"}} {value:.6f}')
+            count, total = self._latency_totals[host]
+            lines.append(f'crawler_response_latency_seconds_count{{{labels}}} {count}')
+            lines.append(f'crawler_response_latency_seconds_sum{{{labels}}} {total:.6f}')
+        return '\n'.join(lines) + '\n'
+
+
+METRIC_HELP = {
+    'crawler_pages_total': ('counter', 'HTML pages fetched and parsed'),
+    'crawler_page_bytes_total': ('counter', 'Bytes of HTML read'),
+    'crawler_file_bytes_total': ('counter', 'Bytes of downloaded files written'),
+    'crawler_parse_seconds_total': ('counter', 'Time spent parsing pages'),
+    'crawler_redirects_total': ('counter', 'Redirects queued'),
+    'crawler_frontier_size': ('gauge', 'URLs waiting in the frontier'),
+    'crawler_in_flight': ('gauge', 'Pages being fetched'),
+    'crawler_pages_per_second': ('gauge', 'Average pages per second since the crawl started'),
+    'crawler_responses_total': ('counter', 'Responses by HTTP status'),
+    'crawler_errors_total': ('counter', 'Failed fetches by error type'),
+    'crawler_response_latency_seconds': ('summary', 'Time to response headers per host'),
+}
+
+
+def write_prometheus(path: pathlib.Path, metrics: list[CrawlMetrics]) -> None:
+    """Атомарно записывает метрики всех целей в файл (формат textfile-коллектора node_exporter)."""
+    by_name: defaultdict[str, list[str]] = defaultdict(list)
+    for crawl_metrics in metrics:
+        for line in crawl_metrics.render_prometheus().splitlines():
+            name = line.split('{', 1)[0]
+            # _count/_sum сводки идут под ее собственным именем
+            for suffix in ('_count', '_sum'):
+                if name.endswith(suffix) and name.removesuffix(suffix) in METRIC_HELP:
+                    name = name.removesuffix(suffix)
+            by_name[name].append(line)
+    output = []
+    for name, (metric_type, help_text) in METRIC_HELP.items():
+        if by_name.get(name):
+            output += [f'# HELP {name} {help_text}', f'# TYPE {name} {metric_type}', *by_name[name]]
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        tmp_path.write_text('\n'.join(output) + '\n', encoding='utf-8')
+        tmp_path.replace(path)
+    except OSError as e:
+        logger.error(f"Ошибка записи метрик в {path}: {e}")
@@ -2,9 +2,24 @@ import json
 import logging
 import pathlib
 
+from crawler.src.crawler_constants import message_links, message_directories, message_files, message_emails, \
+    message_externals, message_directories_with_indexing
+from ndjson_stream import iter_records
+
 # Настройка логирования
 logger = logging.getLogger(__name__)
 
+# Поле 'type' NDJSON-записи совпадает с ключом списка в результате краулера
+EMPTY_MESSAGES = {
+    'links': ('message_links', message_links),
+    'directories': ('message_directories', message_directories),
+    'files': ('message_files', message_files),
+    'emails': ('message_emails', message_emails),
+    'externals': ('message_externals', message_externals),
+    'directories_with_indexing': ('message_directories_with_indexing', message_directories_with_indexing),
+}
+
+
 def output_results(results: list[dict], output_file: pathlib.Path) -> None:
     """Сохраняет результаты сканирования в JSON и, при необходимости, в текстовый файл."""
     try:
@@ -18,3 +33,44 @@ def output_results(results: list[dict], output_file: pathlib.Path) -> None:
     except Exception as e:
         logger.error(f"Неизвестная ошибка при выводе результатов: {e}")
         raise
+
+
+def compact_stream(stream_file: pathlib.Path, targets: list[str] | None = None) -> list[dict]:
+    """Собирает NDJSON-поток в структуру, которую пишет output_results.
+
+    Схема записей общая с анализатором доменов (ndjson_stream в корне репозитория): у каждой
+    есть 'type', 'value' и 'target'. Для целей с финальной записью 'result' берется ее
+    'value'; для прерванных целей результат восстанавливается из отдельных записей.
+
+    Порядок записей в потоке зависит от планирования процессов, поэтому результаты
+    идут в порядке targets (как без потока), а цели, которых там нет, — следом, в
+    порядке их первой записи.
+    """
+    finished: dict[str, dict] = {}
+    partial: dict[str, dict[str, set]] = {}
+    order: dict[str, None] = dict.fromkeys(targets or ())
+    for record in iter_records(stream_file):
+        target = record.get('target')
+        if target is None:
+            continue
+        order.setdefault(target)
+        if record.get('type') == 'result':
+            finished[target] = record['value']
+        elif record.get('type') in EMPTY_MESSAGES:
+            values = partial.setdefault(target, {key: set() for key in EMPTY_MESSAGES})
+            values[record['type']].add(record['value'])
+
+    results = []
+    for target in order:
+        if target in finished:
+            results.append({'target': target, 'result': finished[target]})
+            continue
+        if target not in partial:
+            continue
+        data = {key: sorted(values) for key, values in partial[target].items()}
+        data['messages'] = {
+            message_key: message for key, (message_key, message) in EMPTY_MESSAGES.items() if not data[key]
+        }
+        data = {k: v for k, v in data.items() if not isinstance(v, list) or v}
+        results.append({'target': target, 'result': data})
+    return results
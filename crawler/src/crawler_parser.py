@@ -0,0 +1,89 @@
+import codecs
+import logging
+from html.parser import HTMLParser
+
+from crawler.src.crawler_constants import email_regex
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Теги и атрибуты, из которых извлекаются ссылки
+LINK_TAGS = frozenset({'a', 'iframe', 'img'})
+LINK_ATTRIBUTES = frozenset({'href', 'src'})
+
+# Символы, которые не могут входить в email-адрес: по ним безопасно резать буфер между чанками
+EMAIL_DELIMITERS = ' \t\r\n<>"\'(),;:[]{}|\\/=`!?#$^&*~'
+MAX_EMAIL_TAIL = 320
+
+
+class PageExtractor(HTMLParser):
+    """Однопроходный потоковый извлекатель ссылок и email-адресов из HTML.
+
+    Страница подается чанками байтов через feed_bytes(); после каждого чанка
+    накопленные ссылки и email-адреса забираются через drain(). DOM не строится,
+    а чтение прекращается по достижении max_bytes.
+    """
+
+    def __init__(self, encoding: str | None = None, max_bytes: int | None = None):
+        super().__init__(convert_charrefs=True)
+        try:
+            decoder_factory = codecs.getincrementaldecoder(encoding or 'utf-8')
+        except LookupError:
+            decoder_factory = codecs.getincrementaldecoder('utf-8')
+        self._decoder = decoder_factory(errors='replace')
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+        self.truncated = False
+        self._links: list[str] = []
+        self._emails: set[str] = set()
+        self._email_tail = ''
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if tag not in LINK_TAGS:
+            return
+        for name, value in attrs:
+            if name in LINK_ATTRIBUTES and value:
+                self._links.append(value)
+
+    def _scan_emails(self, text: str, final: bool = False) -> None:
+        """Ищет email-адреса, перенося хвост без разделителя в следующий чанк."""
+        buffer = self._email_tail + text
+        cut = len(buffer)
+        if not final:
+            cut = max(buffer.rfind(ch) for ch in EMAIL_DELIMITERS) + 1
+            if len(buffer) - cut > MAX_EMAIL_TAIL:
+                cut = len(buffer)
+        self._emails.update(email_regex.findall(buffer, 0, cut))
+        self._email_tail = buffer[cut:]
+
+    def feed_bytes(self, chunk: bytes) -> bool:
+        """Обрабатывает очередной чанк. Возвращает False, когда достигнут лимит байтов."""
+        if self.max_bytes:
+            remaining = self.max_bytes - self.bytes_read
+            # Обрезкой считаются только байты сверх лимита: страница ровно в max_bytes читается целиком
+            if len(chunk) > remaining:
+                chunk = chunk[:remaining]
+                self.truncated = True
+        self.bytes_read += len(chunk)
+        text = self._decoder.decode(chunk)
+        if text:
+            self._scan_emails(text)
+            self.feed(text)
+        return not self.truncated
+
+    def close(self) -> None:
+        """Дочитывает буферы декодера и парсера."""
+        text = self._decoder.decode(b'', final=True)
+        self._scan_emails(text, final=True)
+        if text:
+            self.feed(text)
+        super().close()
+
+    def drain(self) -> tuple[list[str], list[str]]:
+        """Возвращает ссылки и email-адреса, найденные с прошлого вызова."""
+        links, emails = self._links, list(self._emails)
+        self._links = []
+        self._emails = set()
+        if emails:
+            logger.debug(f"Найдены email-адреса: {', '.join(emails)}")
+        return links, emails
@@ -1,15 +1,18 @@
+import asyncio
 import logging
 import os
-import re
-from urllib.parse import urlparse, urljoin
+from urllib.parse import urlparse, urljoin, urlsplit
 
-import requests
+import aiohttp
 
-from crawler.src.crawler_constants import FILE_EXTENSIONS
+from crawler.src.crawler_constants import FILE_EXTENSIONS, email_regex, PAGE_TIMEOUT, READ_CHUNK_SIZE, INDEX_MARKER, \
+    DIRECTORY_CHECK_BYTES
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
 
+FILE_EXTENSIONS_LOWER: frozenset[str] = frozenset(ext.lower() for ext in FILE_EXTENSIONS)
+
 
 def normalize_url(href: str, base_url: str, allow_subdomains: bool = False) -> str | None:
     try:
@@ -46,23 +49,38 @@ def extract_directories(url: str) -> list[str]:
     return directories
 
 
-def check_directory_indexing(url: str, timeout: int = 5) -> bool:
-    """Проверяет, доступна ли индексация каталога."""
+async def check_directory_indexing(session: aiohttp.ClientSession, url: str, timeout: int = PAGE_TIMEOUT) -> bool:
+    """Проверяет, доступна ли индексация каталога.
+
+    Один GET через пул соединений краулера; тело читается потоком и только до
+    маркера 'Index of' (он в заголовке листинга) или до DIRECTORY_CHECK_BYTES.
+    """
     try:
-        response = requests.head(url.replace(' ', '%20'), timeout=timeout, allow_redirects=True)
-        if response.status_code == 200 and 'text/html' in response.headers.get('Content-Type', ''):
-            if 'Index of' in requests.get(url, timeout=timeout).text:
-                logger.debug(f"Каталог с индексацией найден: {url}")
-                return True
+        async with session.get(
+                url.replace(' ', '%20'),
+                timeout=aiohttp.ClientTimeout(total=timeout),
+                allow_redirects=True
+        ) as response:
+            if response.status != 200 or 'text/html' not in response.headers.get('Content-Type', ''):
+                return False
+            tail, read = b'', 0
+            async for chunk in response.content.iter_chunked(READ_CHUNK_SIZE):
+                # Хвост предыдущего чанка ловит маркер, разрезанный на границе
+                if INDEX_MARKER in tail + chunk:
+                    logger.debug(f"Каталог с индексацией найден: {url}")
+                    return True
+                tail = chunk[-len(INDEX_MARKER):]
+                read += len(chunk)
+                if read >= DIRECTORY_CHECK_BYTES:
+                    break
         return False
-    except requests.RequestException as e:
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
         logger.debug(f"Ошибка проверки индексации {url}: {e}")
         return False
 
 
 def extract_emails(text: str) -> list[str]:
     """Извлекает email-адреса из текста."""
-    email_regex = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
     emails = list(set(email_regex.findall(text)))
     if emails:
         logger.debug(f"Найдены email-адреса: {', '.join(emails)}")
@@ -74,8 +92,8 @@ def is_file_url(url: str, extensions: list[str] = None) -> bool:
     parsed_url = urlparse(url)
     _, ext = os.path.splitext(parsed_url.path)
     if not extensions:
-        extensions = FILE_EXTENSIONS
-    return ext.lower() in [e.lower() for e in extensions]
+        return ext.lower() in FILE_EXTENSIONS_LOWER
+    return ext.lower() in {e.lower() for e in extensions}
 
 
 def is_excluded_url(url: str, exclude_extensions: list[str]) -> bool:
@@ -84,4 +102,75 @@ def is_excluded_url(url: str, exclude_extensions: list[str]) -> bool:
         return False
     parsed_url = urlparse(url)
     _, ext = os.path.splitext(parsed_url.path)
-    return ext.lower() in [e.lower() for e in exclude_extensions]
+    return ext.lower() in {e.lower() for e in exclude_extensions}
+
+
+class UrlClassifier:
+    """Классификатор ссылок, собираемый один раз на краулер.
+
+    Базовый netloc, множества расширений и каталоги для файлов вычисляются заранее,
+    а каждая ссылка разбирается ровно один раз.
+    """
+
+    LINK = 'links'
+    FILE = 'files'
+    EXTERNAL = 'externals'
+
+    def __init__(self, base_url: str, allow_subdomains: bool = False, exclude_extensions: list[str] = None):
+        self.base_netloc = urlsplit(base_url).netloc
+        self.allow_subdomains = allow_subdomains
+        self.file_extensions = FILE_EXTENSIONS_LOWER
+        # Исключения сравниваются с концом URL с учетом регистра, как их задал пользователь
+        self.exclude_suffixes = tuple(exclude_extensions or ())
+        self.base_files_directory = self.files_directory(self.base_netloc)
+        self._files_directories: dict[str, str] = {}
+
+    @staticmethod
+    def files_directory(netloc: str) -> str:
+        """Каталог <домен>/Files для скачанных файлов хоста."""
+        return os.path.join(netloc.replace('www.', '').split(':')[0], 'Files')
+
+    def is_file(self, url: str) -> bool:
+        return self._extension(urlsplit(url).path) in self.file_extensions
+
+    @staticmethod
+    def _extension(path: str) -> str:
+        # urlsplit оставляет ;params в пути, а is_file_url (urlparse) их отбрасывает
+        return os.path.splitext(path.split(';', 1)[0])[1].lower()
+
+    def is_excluded(self, url: str) -> bool:
+        return bool(self.exclude_suffixes) and url.endswith(self.exclude_suffixes)
+
+    def in_scope(self, netloc: str) -> bool:
+        return netloc == self.base_netloc or (self.allow_subdomains and self.base_netloc in netloc)
+
+    def normalize(self, href: str, page_url: str, page_netloc: str) -> str | None:
+        """То же, что normalize_url, но с заранее разобранным netloc страницы."""
+        return self.classify(href, page_url, page_netloc)[0]
+
+    def classify(self, href: str, page_url: str, page_netloc: str) -> tuple[str | None, str | None, str]:
+        """Нормализует ссылку и определяет ее вид: LINK, FILE или EXTERNAL.
+
+        Возвращает (url, вид, каталог для файла); (None, None, '') для отброшенных ссылок.
+        """
+        try:
+            absolute_url = urljoin(page_url, href.strip())
+            parsed_url = urlsplit(absolute_url)
+        except ValueError as e:
+            logger.debug(f"Невалидная ссылка {href}: {e}")
+            return None, None, ''
+        if parsed_url.scheme not in ('http', 'https'):
+            return None, None, ''
+        if not self.allow_subdomains and parsed_url.netloc != page_netloc:
+            return None, None, ''
+        absolute_url = absolute_url.split('#')[0]
+
+        netloc = parsed_url.netloc
+        if not self.in_scope(netloc):
+            return absolute_url, self.EXTERNAL, ''
+        if self._extension(parsed_url.path) not in self.file_extensions:
+            return absolute_url, self.LINK, ''
+        directory = self._files_directories.get(netloc)
+        if directory is None:
+            directory = self._files_directories[netloc] = self.files_directory(netloc)
+        return absolute_url, self.FILE, directory
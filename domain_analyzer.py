@@ -1,12 +1,18 @@
 import argparse
 import logging
 import asyncio
+import sys
+from pathlib import Path
 from crawler.src.crawler_core import Crawler
 from crawler.src.crawler_constants import FILE_EXTENSIONS
-from domain_analyzer.dns_utils import get_A_records
-from domain_analyzer.output_utils import save_json
-from domain_analyzer.nmap_utils import scan_host
-from domain_analyzer.constants import DEFAULT_MAX_CRAWL
+
+# Модули анализатора импортируют друг друга как модули верхнего уровня (from constants import ...),
+# как при запуске domain_analyzer/main.py, поэтому и отсюда они импортируются из своего каталога
+sys.path.insert(0, str(Path(__file__).resolve().parent / "domain_analyzer"))
+from dns_utils import get_A_records
+from output_utils import save_json
+from nmap_utils import scan_host, open_ports
+from constants import DEFAULT_MAX_CRAWL
 
 logger = logging.getLogger(__name__)
 
@@ -34,7 +40,7 @@ class IntegratedAnalyzer:
             self.domain_data["ips"].append({"ip": ip})
 
             # Сканирование портов с помощью Nmap
-            ports = scan_host(ip, self.domain)
+            ports = open_ports(await scan_host(ip, self.domain))
             self.domain_data["ips"][-1]["ports"] = ports
 
             # Запуск веб-краулинга
@@ -1,3 +1,5 @@
+from pathlib import Path
+
 NORMAL_PORT_LIST: list[str] = [
     '21/', '22/', '25/', '53/udp', '80/', '443/', '110/', '143/', '993/', '995/', '465/'
 ]
@@ -27,41 +29,41 @@ COMMON_HOSTNAMES: list[str] = [
     'kamanda', 'fido', 'old'
 ]
 
-GTLD_DOMAINS: list[str] = [
-    'biz', 'info', 'net', 'com', 'org', 'edu', 'gov', 'me', 'tv', 'name'
-]
-
-TLD_DOMAINS: list[str] = [
-    'edu', 'gov', 'mil', 'net', 'org', 'ag', 'co', 'go'
-]
-
-CC_DOMAINS: set[str] = {
-    '.ac', '.ad', '.ae', '.aero', '.af', '.ag', '.ai', '.al', '.am', '.an', '.ao', '.aq',
-    '.ar', '.arpa', '.as', '.asia', '.at', '.au', '.aw', '.ax', '.az', '.ba', '.bb', '.bd',
-    '.be', '.bf', '.bg', '.bh', '.bi', '.biz', '.bj', '.bl', '.bm', '.bn', '.bo', '.bq',
-    '.br', '.bs', '.bt', '.bv', '.bw', '.by', '.bz', '.ca', '.cat', '.cc', '.cd', '.cf',
-    '.cg', '.ch', '.ci', '.ck', '.cl', '.cm', '.cn', '.co', '.com', '.coop', '.cr', '.cu',
-    '.cv', '.cw', '.cx', '.cy', '.cz', '.de', '.dj', '.dk', '.dm', '.do', '.dz', '.ec',
-    '.edu', '.ee', '.eg', '.eh', '.er', '.es', '.et', '.eu', '.fe', '.fi', '.fj', '.fk',
-    '.fm', '.fo', '.fr', '.ga', '.gb', '.gd', '.ge', '.gf', '.gg', '.gh', '.gi', '.gl',
-    '.gm', '.gn', '.gp', '.gq', '.gr', '.gs', '.gt', '.gu', '.gw', '.gy', '.hk', '.hm',
-    '.hn', '.hr', '.ht', '.hu', '.id', '.ie', '.il', '.im', '.in', '.info', '.int', '.io',
-    '.iq', '.ir', '.is', '.it', '.je', '.jm', '.jo', '.jobs', '.jp', '.ke', '.kg', '.kh',
-    '.ki', '.km', '.kn', '.kp', '.kr', '.kw', '.ky', '.kz', '.la', '.lb', '.lc', '.li',
-    '.lk', '.lr', '.ls', '.lt', '.lu', '.lv', '.ly', '.ma', '.mc', '.md', '.me', '.mf',
-    '.mg', '.mh', '.mil', '.mk', '.ml', '.mm', '.mn', '.mo', '.mobi', '.mp', '.mq', '.mr',
-    '.ms', '.mt', '.mu', '.museum', '.mv', '.mw', '.mx', '.my', '.mz', '.na/name', '.nc',
-    '.ne', '.net', '.nf', '.ng', '.ni', '.nl', '.no', '.np', '.nr', '.nu', '.nz', '.om',
-    '.org', '.pa', '.pe', '.pf', '.pg', '.ph', '.pk', '.pl', '.pm', '.pn', '.pr', '.pro',
-    '.ps', '.pt', '.pw', '.py', '.qa', '.re', '.ro', '.rs', '.ru', '.rw', '.sa', '.sb',
-    '.sc', '.sd', '.se', '.sg', '.sh', '.si', '.sj', '.sk', '.sl', '.sm', '.sn', '.so',
-    '.sr', '.st', '.su', '.sv', '.sx', '.sy', '.sz', '.tc', '.td', '.tel', '.tf', '.tg',
-    '.th', '.tj', '.tk', '.tl', '.tm', '.tn', '.to', '.tp', '.tr', '.travel', '.tt',
-    '.tv', '.tw', '.tz', '.ua', '.ug', '.uk', '.um', '.us', '.uy', '.uz', '.va', '.vc',
-    '.ve', '.vg', '.vi', '.vn', '.vu', '.wf', '.ws', '.ye', '.yt', '.za', '.zm', '.zw'
-}
-
 DEFAULT_NMAP_SCANTYPE: str = "-O --reason --webxml --traceroute -sS -sV -sC -Pn -n -v -F"
 ZENMAP_COMMAND: str = "zenmap"
 DEFAULT_MAX_CRAWL: int = 50
 SOCKET_TIMEOUT: int = 10
+AXFR_LIFETIME: float = 120.0
+DNS_CONCURRENCY: int = 100
+DNS_TIMEOUT: float = 5.0
+DNS_RETRIES: int = 2
+DNS_CACHE_SIZE: int = 10000
+DNS_NEGATIVE_TTL: int = 300
+WILDCARD_PROBES: int = 3
+HTTP_PROBE_CONCURRENCY: int = 50
+GEOIP_DATABASE: str = "GeoLite2-Country.mmdb"
+GEOIP_CACHE_SIZE: int = 65536
+NMAP_BATCH_SIZE: int = 16
+NMAP_HOST_TIMEOUT: int = 300
+PING_CONCURRENCY: int = 256
+PING_TIMEOUT: float = 2.0
+MAX_PROCESSES: int = 16
+PROCESS_KILL_GRACE: float = 5.0
+PARALLEL_DOMAINS: int = 8
+STREAM_FLUSH_INTERVAL: float = 2.0
+STREAM_BUFFER_RECORDS: int = 200
+PROFILE_TOP_FUNCTIONS: int = 30
+ROBTEX_URL: str = "https://www.robtex.com/dns-lookup/"
+ROBTEX_CACHE_DIR: str = ".robtex_cache"
+ROBTEX_CACHE_TTL: int = 7 * 24 * 3600
+ROBTEX_RATE: float = 1.0
+ROBTEX_CONCURRENCY: int = 4
+ROBTEX_TIMEOUT: float = 10.0
+TLDS_FILE: str = str(Path(__file__).parent / "data" / "tlds.txt")
+TLD_SWEEP_CONCURRENCY: int = 200
+TLD_SWEEP_TIMEOUT: float = 3.0
+PARKING_NAMESERVERS: tuple[str, ...] = (
+    "sedoparking.com", "parkingcrew.net", "bodis.com", "above.com", "parklogic.com", "afternic.com",
+    "hugedomains.com", "dan.com", "uniregistrymarket.link", "fabulous.com", "dsredirection.com", "cashparking.com",
+    "ztomy.com"
+)
@@ -0,0 +1,208 @@
+import asyncio
+import contextlib
+import errno
+import ipaddress
+import itertools
+import logging
+import os
+import socket
+import struct
+from typing import Iterable, Optional
+
+from constants import NORMAL_PORT_LIST, PING_CONCURRENCY, PING_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+ICMP_PAYLOAD = b"domain_analyzer"
+# Replies for a whole sweep share one socket; raw sockets on loopback also see every request
+ICMP_RECEIVE_BUFFER = 1 << 20
+
+TCP_PROBE_PORTS: list[int] = [int(port.split('/')[0]) for port in NORMAL_PORT_LIST if port.split('/')[1] in ('', 'tcp')]
+
+# Running out of local sockets or buffers says nothing about the target, so these are never read as "host down"
+LOCAL_SOCKET_ERRORS = {errno.EMFILE, errno.ENFILE, errno.ENOBUFS, errno.ENOMEM}
+
+_max_probe_sockets = PING_CONCURRENCY
+_probe_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def set_max_probe_sockets(limit: int) -> None:
+    global _max_probe_sockets, _probe_semaphore
+    _max_probe_sockets, _probe_semaphore = max(1, limit), None
+
+
+def _get_probe_semaphore() -> asyncio.Semaphore:
+    # One budget for the whole process, so parallel domains in batch mode cannot multiply it
+    global _probe_semaphore
+    if _probe_semaphore is None:
+        _probe_semaphore = asyncio.Semaphore(_max_probe_sockets)
+    return _probe_semaphore
+
+
+def _icmp_checksum(data: bytes) -> int:
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xffff)
+    total += total >> 16
+    return ~total & 0xffff
+
+
+def _echo_request(ident: int, sequence: int) -> bytes:
+    header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, ident, sequence)
+    checksum = _icmp_checksum(header + ICMP_PAYLOAD)
+    return struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, checksum, ident, sequence) + ICMP_PAYLOAD
+
+
+def _open_icmp_socket() -> tuple[socket.socket, bool]:
+    # Unprivileged ICMP datagram sockets first (Linux ping_group_range), raw sockets when running as root
+    try:
+        sock, raw = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP), False
+    except OSError:
+        sock, raw = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP), True
+    sock.setblocking(False)
+    return sock, raw
+
+
+class IcmpProber:
+    # One ICMP socket per sweep; every reply is read once and handed to the probe waiting on its (ip, sequence)
+    def __init__(self) -> None:
+        self.sock, self.raw = _open_icmp_socket()
+        with contextlib.suppress(OSError):
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, ICMP_RECEIVE_BUFFER)
+        self.ident = os.getpid() & 0xffff
+        self._sequences = itertools.count(int.from_bytes(os.urandom(2), "big"))
+        self._waiters: dict[tuple[str, int], asyncio.Future] = {}
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(self.sock.fileno(), self._read_replies)
+
+    def _read_replies(self) -> None:
+        while True:
+            try:
+                data, address = self.sock.recvfrom(1024)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                logger.debug(f"Error reading ICMP replies: {e}")
+                return
+            if self.raw:
+                data = data[(data[0] & 0x0f) * 4:]
+            if len(data) < 8:
+                continue
+            reply_type, _, _, reply_ident, reply_sequence = struct.unpack("!BBHHH", data[:8])
+            # Datagram sockets get their identifier rewritten by the kernel, so only raw replies are matched on it
+            if reply_type != ICMP_ECHO_REPLY or (self.raw and reply_ident != self.ident):
+                continue
+            waiter = self._waiters.get((address[0], reply_sequence))
+            if waiter is not None and not waiter.done():
+                waiter.set_result(True)
+
+    async def probe(self, ip: str, timeout: float = PING_TIMEOUT) -> bool:
+        if ipaddress.ip_address(ip).version != 4:
+            return False
+        sequence = next(self._sequences) & 0xffff
+        key = (ip, sequence)
+        self._waiters[key] = self._loop.create_future()
+        try:
+            async with _get_probe_semaphore():
+                await self._loop.sock_sendto(self.sock, _echo_request(self.ident, sequence), (ip, 0))
+                return await asyncio.wait_for(self._waiters[key], timeout)
+        except asyncio.TimeoutError:
+            return False
+        except OSError as e:
+            if e.errno in LOCAL_SOCKET_ERRORS:
+                raise
+            logger.debug(f"ICMP probe to {ip} failed: {e}")
+            return False
+        finally:
+            self._waiters.pop(key, None)
+
+    def close(self) -> None:
+        self._loop.remove_reader(self.sock.fileno())
+        self.sock.close()
+
+
+async def _tcp_probe(ip: str, port: int, timeout: float) -> bool:
+    # Holds one slot of the socket budget for as long as its socket is open
+    async with _get_probe_semaphore():
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout)
+        except ConnectionRefusedError:
+            # A RST still proves the host is up
+            return True
+        except asyncio.TimeoutError:
+            return False
+        except OSError as e:
+            if e.errno in LOCAL_SOCKET_ERRORS:
+                raise
+            return False
+        writer.close()
+        with contextlib.suppress(OSError):
+            await writer.wait_closed()
+        return True
+
+
+async def check_active_host_tcp(ip: str, ports: Iterable[int] = TCP_PROBE_PORTS,
+                                timeout: float = PING_TIMEOUT) -> bool:
+    # The first answering port settles it; a local socket error only surfaces if no port answered
+    probes = [asyncio.create_task(_tcp_probe(ip, port, timeout)) for port in ports]
+    error: Optional[OSError] = None
+    try:
+        for finished in asyncio.as_completed(probes):
+            try:
+                if await finished:
+                    return True
+            except OSError as e:
+                error = e
+        if error is not None:
+            raise error
+        return False
+    finally:
+        for probe in probes:
+            probe.cancel()
+
+
+async def discover_active_hosts(ips: Iterable[str], method: str = "both",
+                                timeout: float = PING_TIMEOUT) -> list[str]:
+    use_tcp = method in ("tcp", "both")
+    icmp: Optional[IcmpProber] = None
+    if method in ("icmp", "both"):
+        try:
+            icmp = IcmpProber()
+        except OSError as e:
+            logger.warning(f"ICMP sockets are not available ({e}), falling back to TCP-connect probes")
+            use_tcp = True
+
+    async def probe(ip: str) -> bool:
+        if icmp is not None and await icmp.probe(ip, timeout):
+            return True
+        return use_tcp and await check_active_host_tcp(ip, timeout=timeout)
+
+    ips = list(ips)
+    pending = iter(ips)
+    active: set[str] = set()
+    errors: dict[str, OSError] = {}
+
+    async def worker() -> None:
+        for ip in pending:
+            try:
+                if await probe(ip):
+                    active.add(ip)
+            except OSError as e:
+                errors[ip] = e
+
+    # Hosts are pulled by a bounded pool, so a large sweep never creates a task per host and port up front
+    try:
+        await asyncio.gather(*(worker() for _ in range(min(len(ips), _max_probe_sockets))))
+    finally:
+        if icmp is not None:
+            icmp.close()
+
+    if errors:
+        logger.error(f"Could not probe {len(errors)} hosts ({next(iter(errors.values()))}), "
+                     f"keeping them for the port scan")
+    active_ips = [ip for ip in ips if ip in active or ip in errors]
+    logger.info(f"{len(active)} of {len(ips)} hosts are active")
+    return active_ips
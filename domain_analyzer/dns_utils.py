@@ -1,21 +1,186 @@
+import asyncio
+import fcntl
+import functools
+import json
 import logging
-import socket
-from typing import Optional
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Iterable, Optional
 
+import dns.asyncresolver
+import dns.exception
+import dns.name
 import dns.query
+import dns.rdatatype
 import dns.resolver
-import dns.zone
+import dns.reversename
 import geoip2.database
+import geoip2.errors
 
-from constants import SOCKET_TIMEOUT
+from constants import SOCKET_TIMEOUT, AXFR_LIFETIME, DNS_CONCURRENCY, DNS_TIMEOUT, DNS_RETRIES, DNS_CACHE_SIZE, \
+    DNS_NEGATIVE_TTL, WILDCARD_PROBES, GEOIP_DATABASE, GEOIP_CACHE_SIZE
+from timing_utils import count
 
 logger = logging.getLogger(__name__)
 
+NEGATIVE_ANSWERS = (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer)
+NEGATIVE_ANSWER_TYPES: dict[str, type[Exception]] = {error.__name__: error for error in NEGATIVE_ANSWERS}
+
+RECORD_FORMATTERS: dict[str, Callable[[Any], dict[str, str]]] = {
+    "A": lambda rdata: {"ip": str(rdata.address)},
+    "AAAA": lambda rdata: {"ip": str(rdata.address)},
+    "NS": lambda rdata: {"hostname": str(rdata.target)},
+    "MX": lambda rdata: {"hostname": str(rdata.exchange), "preference": str(rdata.preference)},
+    "PTR": lambda rdata: {"hostname": str(rdata.target)},
+    "CNAME": lambda rdata: {"hostname": str(rdata.target)},
+    "TXT": lambda rdata: {"txt": str(rdata).strip('"')},
+}
+
+
+def format_records(rdtype: str, answer: Iterable[Any]) -> list[dict[str, str]]:
+    formatter = RECORD_FORMATTERS.get(rdtype, lambda rdata: {"value": rdata.to_text()})
+    return [formatter(rdata) for rdata in answer]
+
+
+class DNSCache:
+    # Entries are keyed on (name, rdtype) and hold (expires_at, records, negative_answer_name).
+    # Expiry is wall-clock time so entries stay valid when persisted and loaded by a later run.
+    def __init__(self, max_entries: int = DNS_CACHE_SIZE, negative_ttl: float = DNS_NEGATIVE_TTL,
+                 path: Optional[Path] = None):
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, str], tuple[float, list[dict[str, str]], Optional[str]]] = \
+            OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, rdtype: str) -> tuple[str, str]:
+        return name.lower().rstrip('.'), rdtype.upper()
+
+    def get(self, name: str, rdtype: str) -> Optional[tuple[list[dict[str, str]], Optional[Exception]]]:
+        key = self._key(name, rdtype)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        _, records, negative = entry
+        return list(records), NEGATIVE_ANSWER_TYPES[negative]() if negative else None
+
+    def put(self, name: str, rdtype: str, records: list[dict[str, str]], ttl: float,
+            negative: Optional[Exception] = None) -> None:
+        if negative is not None:
+            ttl = self.negative_ttl
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        key = self._key(name, rdtype)
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, list(records), type(negative).__name__ if negative else None)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _read(self) -> OrderedDict:
+        entries: OrderedDict = OrderedDict()
+        if not self.path.exists():
+            return entries
+        try:
+            with self.path.open() as f:
+                stored = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable DNS cache {self.path}: {e}")
+            return entries
+        now = time.time()
+        for name, rdtype, expires_at, records, negative in stored:
+            if expires_at > now and (negative is None or negative in NEGATIVE_ANSWER_TYPES):
+                entries[(name, rdtype)] = (expires_at, records, negative)
+        return entries
+
+    def load(self, path: Optional[Path] = None) -> None:
+        self.path = Path(path) if path else self.path
+        if not self.path:
+            return
+        entries = self._read()
+        with self._lock:
+            self._entries.update(entries)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        logger.info(f"Loaded {len(self._entries)} DNS cache entries from {self.path}")
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Batch worker processes all save at teardown: each one merges into what is on disk under an
+            # exclusive lock, so the last to finish does not drop the entries of the others
+            with self.path.with_name(f"{self.path.name}.lock").open('w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                entries = self._read()
+                with self._lock:
+                    for key, entry in self._entries.items():
+                        if key not in entries or entries[key][0] <= entry[0]:
+                            entries[key] = entry
+                            entries.move_to_end(key)
+                now = time.time()
+                stored = [[name, rdtype, expires_at, records, negative]
+                          for (name, rdtype), (expires_at, records, negative) in entries.items()
+                          if expires_at > now]
+                # Most recently used entries are last; the file keeps the same bound as memory
+                stored = stored[max(0, len(stored) - self.max_entries):]
+                tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+                with tmp_path.open('w') as f:
+                    json.dump(stored, f)
+                tmp_path.replace(self.path)
+        except OSError as e:
+            logger.error(f"Error saving DNS cache to {self.path}: {e}")
+
+
+# Process-wide cache shared by the sync getters and resolve_bulk for the whole analysis run
+dns_cache = DNSCache()
+
+
+def _query_name(name: str, rdtype: str) -> Any:
+    return dns.reversename.from_address(name) if rdtype == 'PTR' else name
+
+
+def _cached_resolve(name: str, rdtype: str) -> list[dict[str, str]]:
+    cached = dns_cache.get(name, rdtype)
+    if cached is not None:
+        count("dns_cache_hits")
+        records, negative = cached
+        if negative is not None:
+            raise negative
+        return records
+    count("dns_queries")
+    try:
+        answers = dns.resolver.resolve(_query_name(name, rdtype), rdtype)
+    except NEGATIVE_ANSWERS as e:
+        dns_cache.put(name, rdtype, [], 0, negative=e)
+        raise
+    records = format_records(rdtype, answers)
+    dns_cache.put(name, rdtype, records, answers.rrset.ttl if answers.rrset is not None else 0)
+    return records
+
 
 def get_NS_records(domain: str) -> list[dict[str, str]]:
     try:
-        answers = dns.resolver.resolve(domain, 'NS')
-        return [{"hostname": str(rdata.target)} for rdata in answers]
+        return _cached_resolve(domain, 'NS')
     except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer, dns.resolver.NoNameservers):
         logger.info(f"No NS records for {domain}")
         return []
@@ -26,8 +191,7 @@ def get_NS_records(domain: str) -> list[dict[str, str]]:
 
 def get_MX_records(domain: str) -> list[dict[str, str]]:
     try:
-        answers = dns.resolver.resolve(domain, 'MX')
-        return [{"hostname": str(rdata.exchange), "preference": str(rdata.preference)} for rdata in answers]
+        return _cached_resolve(domain, 'MX')
     except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer, dns.resolver.NoNameservers):
         logger.info(f"No MX records for {domain}")
         return []
@@ -38,8 +202,7 @@ def get_MX_records(domain: str) -> list[dict[str, str]]:
 
 def get_A_records(domain: str) -> list[dict[str, str]]:
     try:
-        answers = dns.resolver.resolve(domain, 'A')
-        return [{"ip": str(rdata.address)} for rdata in answers]
+        return _cached_resolve(domain, 'A')
     except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer, dns.resolver.NoNameservers):
         logger.info(f"No A records for {domain}")
         return []
@@ -48,14 +211,16 @@ def get_A_records(domain: str) -> list[dict[str, str]]:
         return []
 
 
+def find_SPF_record(txt_records: list[dict[str, str]]) -> Optional[dict[str, str]]:
+    for record in txt_records:
+        if record["txt"].startswith('v=spf1'):
+            return {"spf": record["txt"]}
+    return None
+
+
 def get_SPF_record(domain: str) -> Optional[dict[str, str]]:
     try:
-        answers = dns.resolver.resolve(domain, 'TXT')
-        for rdata in answers:
-            txt = str(rdata).strip('"')
-            if txt.startswith('v=spf1'):
-                return {"spf": txt}
-        return None
+        return find_SPF_record(_cached_resolve(domain, 'TXT'))
     except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer, dns.resolver.NoNameservers):
         logger.info(f"No SPF records for {domain}")
         return None
@@ -66,8 +231,8 @@ def get_SPF_record(domain: str) -> Optional[dict[str, str]]:
 
 def get_PTR_record(ip: str) -> Optional[dict[str, str]]:
     try:
-        answers = dns.resolver.resolve(dns.reversename.from_address(ip), 'PTR')
-        return {"hostname": str(answers[0].target)}
+        records = _cached_resolve(ip, 'PTR')
+        return records[0] if records else None
     except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer, dns.resolver.NoNameservers):
         logger.info(f"No PTR record for {ip}")
         return None
@@ -76,27 +241,195 @@ def get_PTR_record(ip: str) -> Optional[dict[str, str]]:
         return None
 
 
-def check_zone_transfer(domain: str, ns_servers: list[dict[str, str]]) -> list[dict[str, str]]:
-    results = []
-    for ns in ns_servers:
-        ns_hostname = ns["hostname"]
+_async_resolver: Optional[dns.asyncresolver.Resolver] = None
+
+
+def get_async_resolver() -> dns.asyncresolver.Resolver:
+    global _async_resolver
+    if _async_resolver is None:
+        _async_resolver = dns.asyncresolver.Resolver()
+    return _async_resolver
+
+
+async def _resolve_with_retries(resolver: dns.asyncresolver.Resolver, name: str, rdtype: str,
+                                timeout: float, retries: int) -> tuple[list[dict[str, str]], Optional[Exception]]:
+    cached = dns_cache.get(name, rdtype)
+    if cached is not None:
+        count("dns_cache_hits")
+        return cached
+    qname = _query_name(name, rdtype)
+    error: Optional[Exception] = None
+    for attempt in range(retries + 1):
+        count("dns_queries")
         try:
-            socket.setdefaulttimeout(SOCKET_TIMEOUT)
-            zone = dns.zone.from_xfr(dns.query.xfr(ns_hostname, domain))
-            for name, rdata in zone.iterate_rdatas('A'):
-                results.append({"hostname": str(name), "ip": str(rdata.address)})
-        except (dns.exception.FormError, dns.query.TransferError, socket.timeout):
-            logger.info(f"Zone transfer failed for {domain} on {ns_hostname}")
+            answers = await resolver.resolve(qname, rdtype, lifetime=timeout)
+            records = format_records(rdtype, answers)
+            dns_cache.put(name, rdtype, records, answers.rrset.ttl if answers.rrset is not None else 0)
+            return records, None
+        except NEGATIVE_ANSWERS as e:
+            dns_cache.put(name, rdtype, [], 0, negative=e)
+            return [], e
+        except (dns.exception.Timeout, dns.resolver.NoNameservers) as e:
+            error = e
+            logger.debug(f"DNS {rdtype} query for {name} failed (attempt {attempt + 1}/{retries + 1}): {e}")
         except Exception as e:
-            logger.error(f"Error checking zone transfer for {domain} on {ns_hostname}: {e}")
+            return [], e
+    return [], error
+
+
+async def resolve_bulk(queries: Iterable[tuple[str, str]], concurrency: int = DNS_CONCURRENCY,
+                       timeout: float = DNS_TIMEOUT, retries: int = DNS_RETRIES,
+                       resolver: Optional[dns.asyncresolver.Resolver] = None
+                       ) -> AsyncIterator[tuple[str, str, list[dict[str, str]], Optional[Exception]]]:
+    # Queries are pulled lazily from the iterable, so long (file-backed) inputs are never materialized
+    resolver = resolver or get_async_resolver()
+    pending = iter(queries)
+    results: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    done = object()
+
+    async def worker() -> None:
+        for name, rdtype in pending:
+            records, error = await _resolve_with_retries(resolver, name, rdtype, timeout, retries)
+            await results.put((name, rdtype, records, error))
+
+    async def run_workers() -> None:
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+        await results.put(done)
+
+    runner = asyncio.create_task(run_workers())
+    try:
+        while (item := await results.get()) is not done:
+            yield item
+    finally:
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+
+
+async def resolve_records(name: str, rdtype: str, timeout: float = DNS_TIMEOUT,
+                          retries: int = DNS_RETRIES) -> list[dict[str, str]]:
+    records, _ = await _resolve_with_retries(get_async_resolver(), name, rdtype, timeout, retries)
+    return records
+
+
+async def detect_wildcard_ips(domain: str, probes: int = WILDCARD_PROBES) -> set[str]:
+    # Random labels should never exist; any address they resolve to is a wildcard answer
+    labels = [f"{secrets.token_hex(8)}.{domain}" for _ in range(probes)]
+    wildcard_ips: set[str] = set()
+    async for _, _, records, _ in resolve_bulk((label, 'A') for label in labels):
+        wildcard_ips.update(record["ip"] for record in records)
+    if wildcard_ips:
+        logger.warning(f"Wildcard DNS detected for *.{domain}: {', '.join(sorted(wildcard_ips))}")
+    return wildcard_ips
+
+
+ZONE_TRANSFER_FORMATTERS: dict[str, Callable[[Any], dict[str, str]]] = {
+    "A": lambda rdata: {"ip": str(rdata.address)},
+    "AAAA": lambda rdata: {"ip": str(rdata.address)},
+    "CNAME": lambda rdata: {"target": str(rdata.target)},
+    "MX": lambda rdata: {"exchange": str(rdata.exchange), "preference": str(rdata.preference)},
+}
+
+
+def _transfer_zone(domain: str, address: str, timeout: float, lifetime: float) -> list[dict[str, str]]:
+    # Messages are consumed as they arrive and only the interesting records are kept,
+    # so a leaked zone is never materialized as a whole
+    origin = dns.name.from_text(domain)
+    records = []
+    for message in dns.query.xfr(address, domain, timeout=timeout, lifetime=lifetime):
+        for rrset in message.answer:
+            rdtype = dns.rdatatype.to_text(rrset.rdtype)
+            formatter = ZONE_TRANSFER_FORMATTERS.get(rdtype)
+            if formatter is None:
+                continue
+            hostname = str(rrset.name.relativize(origin))
+            records.extend({"hostname": hostname, "type": rdtype, **formatter(rdata)} for rdata in rrset)
+    return records
+
+
+async def _try_zone_transfer(domain: str, ns_hostname: str, address: str, timeout: float,
+                             lifetime: float) -> list[dict[str, str]]:
+    count("zone_transfer_attempts")
+    try:
+        records = await asyncio.to_thread(_transfer_zone, domain, address, timeout, lifetime)
+        logger.warning(f"Zone transfer succeeded for {domain} on {ns_hostname} ({address}): {len(records)} records")
+        return records
+    except (dns.exception.FormError, dns.query.TransferError, dns.exception.Timeout, EOFError, OSError):
+        logger.info(f"Zone transfer failed for {domain} on {ns_hostname} ({address})")
+    except Exception as e:
+        logger.error(f"Error checking zone transfer for {domain} on {ns_hostname} ({address}): {e}")
+    return []
+
+
+async def check_zone_transfer(domain: str, ns_servers: list[dict[str, str]], timeout: float = SOCKET_TIMEOUT,
+                              lifetime: float = AXFR_LIFETIME) -> list[dict[str, str]]:
+    # xfr needs addresses, so every NS hostname is resolved first and all of its addresses are tried at once;
+    # timeout bounds each read and lifetime the whole transfer, without touching the process-wide socket default
+    ns_hostnames = {ns["hostname"].rstrip('.') for ns in ns_servers}
+    targets = [(ns_hostname, record["ip"])
+               async for ns_hostname, _, ns_records, _ in resolve_bulk((ns, rdtype) for ns in ns_hostnames
+                                                                      for rdtype in ('A', 'AAAA'))
+               for record in ns_records]
+    transfers = await asyncio.gather(*(_try_zone_transfer(domain, ns_hostname, address, timeout, lifetime)
+                                       for ns_hostname, address in targets))
+
+    results, seen = [], set()
+    for records in transfers:
+        for record in records:
+            key = tuple(sorted(record.items()))
+            if key not in seen:
+                seen.add(key)
+                results.append(record)
     return results
 
 
+_geoip_database: str = GEOIP_DATABASE
+_geoip_reader: Optional[geoip2.database.Reader] = None
+_geoip_unavailable = False
+_geoip_lock = threading.Lock()
+
+
+def set_geoip_database(path: str) -> None:
+    global _geoip_database, _geoip_reader, _geoip_unavailable
+    with _geoip_lock:
+        if _geoip_reader is not None:
+            _geoip_reader.close()
+        _geoip_database, _geoip_reader, _geoip_unavailable = path, None, False
+    _lookup_country.cache_clear()
+
+
+def _get_geoip_reader() -> Optional[geoip2.database.Reader]:
+    global _geoip_reader, _geoip_unavailable
+    if _geoip_reader is not None or _geoip_unavailable:
+        return _geoip_reader
+    with _geoip_lock:
+        if _geoip_reader is None and not _geoip_unavailable:
+            try:
+                _geoip_reader = geoip2.database.Reader(_geoip_database, mode=geoip2.database.MODE_MMAP)
+            except Exception as e:
+                logger.error(f"Error opening GeoIP database {_geoip_database}: {e}")
+                _geoip_unavailable = True
+    return _geoip_reader
+
+
+@functools.lru_cache(maxsize=GEOIP_CACHE_SIZE)
+def _lookup_country(ip: str) -> Optional[str]:
+    reader = _get_geoip_reader()
+    if reader is None:
+        return None
+    try:
+        return reader.country(ip).country.name or "Unknown"
+    except geoip2.errors.AddressNotFoundError:
+        return "Unknown"
+
+
 def get_geoip_info(ip: str) -> Optional[dict[str, str]]:
     try:
-        with geoip2.database.Reader('GeoLite2-Country.mmdb') as reader:
-            response = reader.country(ip)
-            return {"country": response.country.name or "Unknown"}
+        country = _lookup_country(ip)
+        return {"country": country} if country else None
     except Exception as e:
         logger.error(f"Error fetching GeoIP for {ip}: {e}")
         return None
+
+
+def get_geoip_info_bulk(ips: Iterable[str]) -> dict[str, Optional[dict[str, str]]]:
+    return {ip: get_geoip_info(ip) for ip in set(ips)}
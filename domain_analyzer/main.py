@@ -1,16 +1,28 @@
-from typing import Any, Optional
+from typing import Any, Iterable, Iterator, Optional
 import argparse
 import logging
-import socket
+import os
+import sys
 import asyncio
 import aiohttp
-from concurrent.futures import ThreadPoolExecutor
-from dns_utils import get_NS_records, get_MX_records, get_A_records, get_SPF_record, get_PTR_record, \
-    check_zone_transfer, get_geoip_info
-from nmap_utils import check_active_host, scan_host, run_zenmap
-from robtex_utils import find_robtex_domains
-from output_utils import save_json
-from constants import DEFAULT_MAX_CRAWL, COMMON_HOSTNAMES, GTLD_DOMAINS, TLD_DOMAINS, CC_DOMAINS, DEFAULT_NMAP_SCANTYPE
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+# ndjson_stream is shared with the crawler and lives in the repository root, one level above this script
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from dns_utils import find_SPF_record, check_zone_transfer, get_geoip_info_bulk, set_geoip_database, resolve_bulk, \
+    resolve_records, dns_cache, detect_wildcard_ips
+from nmap_utils import scan_batch, batch_ips, default_nmap_workers, run_zenmap, open_ports
+from discovery_utils import discover_active_hosts, set_max_probe_sockets
+from tld_utils import load_tlds, sweep_tlds, registered_domains
+from process_utils import set_max_processes
+from robtex_utils import find_robtex_domains, configure_robtex, get_robtex_client
+from output_utils import save_json, compact_ndjson
+from ndjson_stream import NDJSONWriter
+from timing_utils import Timings, set_current_timings, reset_current_timings, count, run_profiled
+from constants import DEFAULT_MAX_CRAWL, COMMON_HOSTNAMES, DEFAULT_NMAP_SCANTYPE, \
+    HTTP_PROBE_CONCURRENCY, GEOIP_DATABASE, DNS_CONCURRENCY, NMAP_BATCH_SIZE, PING_CONCURRENCY, PING_TIMEOUT, \
+    PARALLEL_DOMAINS, ROBTEX_CACHE_DIR, ROBTEX_CACHE_TTL, ROBTEX_RATE, MAX_PROCESSES, STREAM_FLUSH_INTERVAL, \
+    STREAM_BUFFER_RECORDS
 
 # TODO: Add SSL/TLS check with Shodan API for future implementation
 
@@ -18,9 +30,17 @@ logger = logging.getLogger(__name__)
 
 
 class DomainAnalyzer:
-    def __init__(self, args: argparse.Namespace):
-        self.domain = args.domain
-        self.output_file = args.output or f"{self.domain}.json"
+    def __init__(self, args: argparse.Namespace, domain: Optional[str] = None,
+                 session: Optional[aiohttp.ClientSession] = None):
+        self.domain = domain or args.domain
+        if domain:
+            # Batch mode: --output names a directory holding one JSON file per domain
+            self.output_file = str(Path(args.output or ".") / f"{self.domain}.json")
+        else:
+            self.output_file = args.output or f"{self.domain}.json"
+        self.session = session
+        self.stream_file = str(Path(self.output_file).with_suffix(".ndjson")) if args.stream else None
+        self.stream: Optional[NDJSONWriter] = None
         self.max_crawl = args.max_amount_to_crawl
         self.download_files = args.download_files
         self.ignore_pattern = args.ignore_host_pattern
@@ -32,6 +52,13 @@ class DomainAnalyzer:
         self.robtex = args.robtex_domains
         self.all_robtex = args.all_robtex
         self.world_domination = args.world_domination
+        self.hostnames_file = args.hostnames_file
+        self.http_probe = not args.no_http_probe
+        self.nmap_workers = max(1, args.nmap_workers or default_nmap_workers())
+        self.nmap_batch_size = max(1, args.nmap_batch_size)
+        self.ping_method = args.ping_method
+        self.ping_timeout = args.ping_timeout
+        self.timings = Timings()
         self.domain_data: dict[str, Any] = {
             "domain": self.domain,
             "ips": [],
@@ -39,84 +66,217 @@ class DomainAnalyzer:
         }
 
     async def analyze_domain(self) -> None:
-        ns_records = get_NS_records(self.domain)
-        mx_records = get_MX_records(self.domain)
-        a_records = get_A_records(self.domain)
-        spf_record = get_SPF_record(self.domain)
+        timings_token = set_current_timings(self.timings)
+        if self.stream_file:
+            Path(self.stream_file).unlink(missing_ok=True)
+            self.stream = NDJSONWriter(self.stream_file, STREAM_FLUSH_INTERVAL, STREAM_BUFFER_RECORDS)
+            self._emit("domain", self.domain)
+        try:
+            if self.session is not None:
+                await self._analyze()
+                return
+            async with aiohttp.ClientSession() as session:
+                self.session = session
+                try:
+                    await self._analyze()
+                finally:
+                    self.session = None
+        finally:
+            reset_current_timings(timings_token)
+            if self.stream:
+                self.stream.close()
+                self.stream = None
+
+    def _emit(self, record_type: str, value: Any, key: Optional[str] = None) -> None:
+        if self.stream is None:
+            return
+        fields = {"key": key} if key else {}
+        self.stream.write(record_type, value, **fields)
+
+    def _set_domain_info(self, key: str, value: Any) -> None:
+        self.domain_data["domain_info"][key] = value
+        self._emit("domain_info", value, key)
+
+    async def _analyze(self) -> None:
+        stage = self.timings.stage
+        with stage("dns_records"):
+            # Async lookups on the shared resolver: in batch mode other domains keep running on this loop
+            ns_records, mx_records, a_records, txt_records = await asyncio.gather(
+                *(resolve_records(self.domain, rdtype) for rdtype in ('NS', 'MX', 'A', 'TXT')))
+            spf_record = find_SPF_record(txt_records)
 
         ip_set: set[str] = {record["ip"] for record in a_records}
         subdomains: list[str] = [self.domain]
 
-        if not self.no_subdomains:
-            subdomains.extend(await self._find_subdomains())
+        with stage("subdomains"):
+            if not self.no_subdomains:
+                subdomains.extend(await self._find_subdomains())
 
-        for subdomain in subdomains:
-            self.domain_data["domain_info"]["subdomains"].append(subdomain)
-            subdomain_a_records = get_A_records(subdomain)
-            ip_set.update(record["ip"] for record in subdomain_a_records)
+            self.domain_data["domain_info"]["subdomains"].extend(subdomains)
+            for subdomain in subdomains:
+                self._emit("subdomain", subdomain)
+            async for _, _, subdomain_a_records, _ in resolve_bulk((subdomain, 'A') for subdomain in subdomains):
+                ip_set.update(record["ip"] for record in subdomain_a_records)
 
         if not self.no_zone_transfer:
-            zone_transfer_records = check_zone_transfer(self.domain, ns_records)
-            ip_set.update(record["ip"] for record in zone_transfer_records)
+            with stage("zone_transfer"):
+                zone_transfer_records = await check_zone_transfer(self.domain, ns_records)
+            if zone_transfer_records:
+                self._set_domain_info("zone_transfer", zone_transfer_records)
+            # Host discovery and nmap only handle IPv4; AAAA records stay in domain_info["zone_transfer"]
+            ip_set.update(record["ip"] for record in zone_transfer_records if record["type"] == "A")
 
-        with ThreadPoolExecutor() as executor:
-            active_ips = [ip for ip in ip_set if executor.submit(check_active_host, ip).result()]
+        with stage("host_discovery"):
+            active_ips = await discover_active_hosts(ip_set, self.ping_method, self.ping_timeout)
+        self.timings.count("active_hosts", len(active_ips))
 
-        for ip in active_ips:
-            ip_info = self._collect_ip_info(ip, ns_records, mx_records, spf_record)
-            self.domain_data["ips"].append(ip_info)
+        with stage("ip_info"):
+            await self._collect_ips_info(active_ips)
 
         if self.robtex or self.all_robtex:
-            related_domains = find_robtex_domains(self.domain, ns_records, self.all_robtex)
-            self.domain_data["domain_info"]["related_domains"] = list(related_domains)
+            with stage("robtex"):
+                related_domains = await find_robtex_domains(self.domain, ns_records, self.session, self.all_robtex)
+            self._set_domain_info("related_domains", list(related_domains))
 
         if self.world_domination:
-            await self._world_domination_check()
+            with stage("tld_sweep"):
+                await self._world_domination_check()
 
         if self.use_zenmap:
-            run_zenmap(self.domain)
+            with stage("zenmap"):
+                await run_zenmap(self.domain)
 
+        self.domain_data["timings"] = self.timings.as_dict()
         save_json(self.domain_data, self.output_file)
+        self._emit("result", self.domain_data)
+
+    def _iter_hostnames(self) -> Iterator[str]:
+        seen: set[str] = set()
+        for hostname in COMMON_HOSTNAMES:
+            if hostname not in seen:
+                seen.add(hostname)
+                yield hostname
+        if not self.hostnames_file:
+            return
+        try:
+            with open(self.hostnames_file) as f:
+                for line in f:
+                    hostname = line.strip().lower().rstrip('.')
+                    if hostname and not hostname.startswith('#') and hostname not in seen:
+                        seen.add(hostname)
+                        yield hostname
+        except OSError as e:
+            logger.error(f"Error reading hostnames file {self.hostnames_file}: {e}")
 
     async def _find_subdomains(self) -> list[str]:
+        wildcard_ips = await detect_wildcard_ips(self.domain)
         subdomains = []
-        async with aiohttp.ClientSession() as session:
-            tasks = [
-                self._check_subdomain(session, f"{hostname}.{self.domain}")
-                for hostname in COMMON_HOSTNAMES
-            ]
+        queries = ((f"{hostname}.{self.domain}", 'A') for hostname in self._iter_hostnames())
+        async for subdomain, _, records, _ in resolve_bulk(queries):
+            ips = {record["ip"] for record in records}
+            if ips and not ips <= wildcard_ips:
+                subdomains.append(subdomain)
+        logger.info(f"{len(subdomains)} subdomains of {self.domain} resolved")
+
+        if self.http_probe and subdomains:
+            semaphore = asyncio.Semaphore(HTTP_PROBE_CONCURRENCY)
+            tasks = [self._check_subdomain(self.session, semaphore, subdomain) for subdomain in subdomains]
             results = await asyncio.gather(*tasks, return_exceptions=True)
-            subdomains.extend([result for result in results if isinstance(result, str)])
+            self._set_domain_info("web_subdomains", [r for r in results if isinstance(r, str)])
         return subdomains
 
-    async def _check_subdomain(self, session: aiohttp.ClientSession, subdomain: str) -> Optional[str]:
-        try:
-            async with session.get(f"http://{subdomain}", timeout=5) as response:
-                if response.status == 200:
-                    return subdomain
-        except (aiohttp.ClientError, asyncio.TimeoutError):
-            pass
+    async def _check_subdomain(self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore,
+                               subdomain: str) -> Optional[str]:
+        async with semaphore:
+            try:
+                count("http_requests")
+                async with session.get(f"http://{subdomain}", timeout=5) as response:
+                    # Only the status matters, so the body is not read; count what arrived with the headers
+                    count("http_bytes", response.content.total_bytes)
+                    if response.status == 200:
+                        return subdomain
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                pass
         return None
 
-    def _collect_ip_info(self, ip: str, ns_records: list[dict[str, str]], mx_records: list[dict[str, str]],
-                         spf_record: Optional[dict[str, str]]) -> dict[str, Any]:
+    async def _collect_ips_info(self, active_ips: list[str]) -> None:
+        # GeoIP is a local lookup and is done in one batch; PTR and nmap stages get their own pools
+        domain_records, www_records = await asyncio.gather(resolve_records(self.domain, 'A'),
+                                                           resolve_records(f"www.{self.domain}", 'A'))
+        base_records = domain_records + www_records
+        geoip_info = get_geoip_info_bulk(active_ips)
+        dns_semaphore = asyncio.Semaphore(DNS_CONCURRENCY)
+        loop = asyncio.get_running_loop()
+        scan_results: dict[str, asyncio.Future] = {ip: loop.create_future() for ip in active_ips}
+        scheduler = asyncio.create_task(self._schedule_scans(active_ips, scan_results))
+
+        tasks = [
+            self._collect_ip_info(ip, base_records, geoip_info.get(ip), dns_semaphore, scan_results[ip])
+            for ip in active_ips
+        ]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                ip_info = await finished
+                self.domain_data["ips"].append(ip_info)
+                self._emit("ip", ip_info)
+                logger.info(f"Finished collecting info for {ip_info['ip']}")
+        finally:
+            scheduler.cancel()
+            await asyncio.gather(scheduler, return_exceptions=True)
+
+    async def _schedule_scans(self, active_ips: list[str], scan_results: dict[str, asyncio.Future]) -> None:
+        # One nmap process per batch of IPs (-iL), at most nmap_workers of them at a time
+        semaphore = asyncio.Semaphore(self.nmap_workers)
+
+        async def run_batch(batch_index: int, batch: list[str]) -> None:
+            results: dict[str, dict[str, Any]] = {}
+            try:
+                async with semaphore:
+                    with self.timings.stage("nmap_batch"):
+                        results = await scan_batch(batch, self.domain, self.nmap_scantype, batch_index)
+            finally:
+                for ip in batch:
+                    if not scan_results[ip].done():
+                        scan_results[ip].set_result(results.get(ip))
+
+        batches = batch_ips(active_ips, self.nmap_workers, self.nmap_batch_size)
+        logger.info(f"Scanning {len(active_ips)} hosts in {len(batches)} nmap batches, {self.nmap_workers} at a time")
+        await asyncio.gather(*(run_batch(index, batch) for index, batch in enumerate(batches)))
+
+    async def _resolve_ptr(self, ip: str, semaphore: asyncio.Semaphore) -> Optional[dict[str, str]]:
+        async with semaphore:
+            records = await resolve_records(ip, 'PTR')
+        return records[0] if records else None
+
+    async def _collect_ip_info(self, ip: str, base_records: list[dict[str, str]], geoip: Optional[dict[str, str]],
+                               dns_semaphore: asyncio.Semaphore, scan_result: asyncio.Future) -> dict[str, Any]:
         info = {"ip": ip, "info": []}
 
-        for record in get_A_records(self.domain) + get_A_records(f"www.{self.domain}"):
+        ptr, host = await asyncio.gather(self._resolve_ptr(ip, dns_semaphore), scan_result)
+        ports = open_ports(host)
+
+        for record in base_records:
             if record["ip"] == ip:
                 info["info"].append({"hostname": self.domain, "type": "A"})
 
-        geoip = get_geoip_info(ip)
         if geoip:
             info["info"].append(geoip)
 
-        ptr = get_PTR_record(ip)
         if ptr:
             info["info"].append(ptr)
 
-        ports = scan_host(ip, self.domain, self.nmap_scantype)
         if ports:
             info["info"].append({"ports": [f"{p['port']} {p['service']}" for p in ports]})
+            info["info"].append({"services": ports})
+
+        if host and host["os"]:
+            info["info"].append({"os": host["os"]})
+
+        if host and host["traceroute"]:
+            info["info"].append({"traceroute": host["traceroute"]})
+
+        if host and host["scripts"]:
+            info["info"].append({"host_scripts": host["scripts"]})
 
         # Placeholder for crawler integration
         if not self.no_net_block:
@@ -126,28 +286,100 @@ class DomainAnalyzer:
         return info
 
     async def _world_domination_check(self) -> None:
-        tlds = GTLD_DOMAINS + TLD_DOMAINS + list(CC_DOMAINS)
-        async with aiohttp.ClientSession() as session:
-            tasks = [
-                self._check_tld_domain(session, tld)
-                for tld in tlds if not self.ignore_pattern or tld not in self.ignore_pattern
-            ]
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            self.domain_data["domain_info"]["tld_domains"] = [r for r in results if isinstance(r, str)]
+        tlds = [tld for tld in load_tlds() if not self.ignore_pattern or tld not in self.ignore_pattern]
+        results = await sweep_tlds(self.domain.split('.')[0], tlds)
+        self._set_domain_info("tld_domains", registered_domains(results))
+        self._set_domain_info("tld_sweep", results)
+
+
+def iter_domains(domains_file: str) -> Iterator[str]:
+    stream = sys.stdin if domains_file == "-" else open(domains_file)
+    try:
+        seen: set[str] = set()
+        for line in stream:
+            domain = line.strip().lower().rstrip('.')
+            if domain and not domain.startswith('#') and domain not in seen:
+                seen.add(domain)
+                yield domain
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+async def analyze_domains(args: argparse.Namespace, domains: Iterable[str]) -> None:
+    # N analyzers pull from one domain iterator and share the HTTP session, the DNS cache/resolver and GeoIP reader
+    pending = iter(domains)
+
+    async def worker(session: aiohttp.ClientSession) -> None:
+        for domain in pending:
+            try:
+                await DomainAnalyzer(args, domain, session).analyze_domain()
+            except Exception as e:
+                logger.error(f"Error analyzing {domain}: {e}")
+
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*(worker(session) for _ in range(max(1, args.parallel_domains))))
+
+
+def setup_shared_state(args: argparse.Namespace) -> None:
+    if args.dns_cache:
+        dns_cache.load(args.dns_cache)
+    if args.geoip_db:
+        set_geoip_database(args.geoip_db)
+    set_max_probe_sockets(args.ping_concurrency)
+    set_max_processes(args.max_processes)
+    configure_robtex(None if args.no_robtex_cache else args.robtex_cache, args.robtex_cache_ttl, args.robtex_rate)
+
+
+def teardown_shared_state() -> None:
+    dns_cache.save()
+    logger.info(f"DNS cache: {dns_cache.hits} hits, {dns_cache.misses} misses")
+    robtex_cache = get_robtex_client().cache
+    if robtex_cache.hits or robtex_cache.misses:
+        logger.info(f"Robtex cache: {robtex_cache.hits} hits, {robtex_cache.misses} misses")
+
+
+async def _analyze_domains_with_state(args: argparse.Namespace, domains: Iterable[str]) -> None:
+    setup_shared_state(args)
+    try:
+        await analyze_domains(args, domains)
+    finally:
+        teardown_shared_state()
+
+
+def _analyze_domains_in_process(args: argparse.Namespace, domains: list[str]) -> None:
+    setup_logging()
+    # Each worker process writes its own profile next to the requested file
+    profile_file = f"{args.profile}.{os.getpid()}" if args.profile else None
+    run_profiled(profile_file, asyncio.run, _analyze_domains_with_state(args, domains))
 
-    async def _check_tld_domain(self, session: aiohttp.ClientSession, tld: str) -> Optional[str]:
-        test_domain = f"{self.domain.split('.')[0]}.{tld.lstrip('.')}"
-        try:
-            socket.gethostbyname(test_domain)
-            return test_domain
-        except socket.gaierror:
-            return None
+
+def run_batch(args: argparse.Namespace) -> None:
+    if args.workers <= 1:
+        asyncio.run(_analyze_domains_with_state(args, iter_domains(args.domains_file)))
+        return
+    domains = list(iter_domains(args.domains_file))
+    chunks = [domains[i::args.workers] for i in range(args.workers)]
+    logger.info(f"Analyzing {len(domains)} domains in {args.workers} processes")
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = [executor.submit(_analyze_domains_in_process, args, chunk) for chunk in chunks if chunk]
+        for future in futures:
+            future.result()
 
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Domain analysis tool")
-    parser.add_argument("-d", "--domain", required=True, help="Domain to analyze")
-    parser.add_argument("-o", "--output", help="Output JSON file")
+    targets = parser.add_mutually_exclusive_group(required=True)
+    targets.add_argument("-d", "--domain", help="Domain to analyze")
+    targets.add_argument("--domains-file", help="File with one domain per line to analyze in batch ('-' for stdin)")
+    parser.add_argument("-o", "--output", help="Output JSON file (output directory in batch mode)")
+    parser.add_argument("--parallel-domains", type=int, default=PARALLEL_DOMAINS,
+                        help="Domains analyzed concurrently in each process (batch mode)")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes to spread domains over (batch mode)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Also append results to <output>.ndjson as they are found")
+    targets.add_argument("--compact-stream", metavar="NDJSON_FILE",
+                         help="Rebuild the JSON output from an interrupted run's NDJSON stream and exit")
     parser.add_argument("--max-amount-to-crawl", type=int, default=DEFAULT_MAX_CRAWL, help="Max URLs to crawl")
     parser.add_argument("--download-files", action="store_true", help="Download files during crawling")
     parser.add_argument("--ignore-host-pattern", help="Pattern to ignore hosts")
@@ -158,7 +390,29 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--zenmap", action="store_true", help="Launch Zenmap for nmap results")
     parser.add_argument("--robtex-domains", action="store_true", help="Check Robtex for related domains")
     parser.add_argument("--all-robtex", action="store_true", help="Check all Robtex domains")
+    parser.add_argument("--robtex-cache", default=ROBTEX_CACHE_DIR,
+                        help="Directory caching Robtex lookups per nameserver across domains and runs")
+    parser.add_argument("--robtex-cache-ttl", type=int, default=ROBTEX_CACHE_TTL,
+                        help="Seconds before a cached Robtex lookup is fetched again")
+    parser.add_argument("--no-robtex-cache", action="store_true", help="Do not read or write the Robtex cache")
+    parser.add_argument("--robtex-rate", type=float, default=ROBTEX_RATE,
+                        help="Max Robtex requests per second from each process (0 for no limit)")
     parser.add_argument("--world-domination", action="store_true", help="Check TLDs for domain")
+    parser.add_argument("--dns-cache", help="File to persist the DNS answer cache between runs")
+    parser.add_argument("--hostnames-file", help="Extra subdomain wordlist, one hostname per line")
+    parser.add_argument("--no-http-probe", action="store_true", help="Do not HTTP-probe resolved subdomains")
+    parser.add_argument("--geoip-db", default=GEOIP_DATABASE, help="Path to the GeoLite2 country database")
+    parser.add_argument("--nmap-workers", type=int, help="Concurrent nmap processes (default: half the CPU count)")
+    parser.add_argument("--max-processes", type=int, default=MAX_PROCESSES,
+                        help="External processes (nmap, zenmap) running at once in each process")
+    parser.add_argument("--nmap-batch-size", type=int, default=NMAP_BATCH_SIZE, help="Hosts per nmap process")
+    parser.add_argument("--ping-method", choices=["icmp", "tcp", "both"], default="both",
+                        help="Host discovery probes: ICMP echo, TCP connect to common ports, or both")
+    parser.add_argument("--ping-concurrency", type=int, default=PING_CONCURRENCY,
+                        help="Host probes in flight at once in each process; every TCP probe holds one socket")
+    parser.add_argument("--ping-timeout", type=float, default=PING_TIMEOUT, help="Host probe timeout in seconds")
+    parser.add_argument("--profile", metavar="STATS_FILE",
+                        help="Run under cProfile and dump the stats to STATS_FILE (.<pid> per batch worker)")
     return parser.parse_args()
 
 
@@ -170,12 +424,26 @@ def setup_logging() -> None:
     )
 
 
-async def main():
+async def analyze_single_domain(args: argparse.Namespace) -> None:
+    setup_shared_state(args)
+    try:
+        analyzer = DomainAnalyzer(args)
+        await analyzer.analyze_domain()
+    finally:
+        teardown_shared_state()
+
+
+def main() -> None:
     setup_logging()
     args = parse_args()
-    analyzer = DomainAnalyzer(args)
-    await analyzer.analyze_domain()
+    if args.compact_stream:
+        data = compact_ndjson(args.compact_stream)
+        save_json(data, args.output or str(Path(args.compact_stream).with_suffix(".json")))
+    elif args.domains_file:
+        run_profiled(args.profile, run_batch, args)
+    else:
+        run_profiled(args.profile, asyncio.run, analyze_single_domain(args))
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    main()
@@ -1,74 +1,172 @@
+import asyncio
 import logging
-import subprocess
+import math
+import os
+import xml.etree.ElementTree as ET
 from pathlib import Path
-from typing import list, dict
+from typing import IO, Any, Iterator, Optional, Union
 
-from constants import DEFAULT_NMAP_SCANTYPE, ZENMAP_COMMAND
+from constants import DEFAULT_NMAP_SCANTYPE, ZENMAP_COMMAND, NMAP_BATCH_SIZE, NMAP_HOST_TIMEOUT
+from process_utils import run_process
 
 logger = logging.getLogger(__name__)
 
 
-def check_active_host(ip: str) -> bool:
-    try:
-        result = subprocess.run(
-            ["ping", "-c", "2", "-W", "1", ip],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        return result.returncode == 0
-    except subprocess.TimeoutExpired:
-        logger.info(f"Ping timeout for {ip}")
-        return False
-    except Exception as e:
-        logger.error(f"Error pinging {ip}: {e}")
-        return False
+def _parse_scripts(parent: ET.Element) -> list[dict[str, str]]:
+    return [{"id": script.get("id", ""), "output": script.get("output", "")} for script in parent.iter("script")]
+
+
+def _parse_port(port: ET.Element) -> dict[str, Any]:
+    state = port.find("state")
+    service = port.find("service")
+    protocol = port.get("protocol", "tcp")
+    return {
+        "port": f"{port.get('portid')}/{protocol}",
+        "protocol": protocol,
+        "state": state.get("state", "unknown") if state is not None else "unknown",
+        "reason": state.get("reason", "") if state is not None else "",
+        "service": service.get("name", "unknown") if service is not None else "unknown",
+        "product": service.get("product", "") if service is not None else "",
+        "version": service.get("version", "") if service is not None else "",
+        "extrainfo": service.get("extrainfo", "") if service is not None else "",
+        "scripts": _parse_scripts(port),
+    }
+
+
+def _parse_host(host: ET.Element) -> dict[str, Any]:
+    record: dict[str, Any] = {"ip": None, "mac": None, "status": "unknown", "hostnames": [], "ports": [],
+                              "os": [], "traceroute": [], "scripts": []}
+    for address in host.iter("address"):
+        if address.get("addrtype") in ("ipv4", "ipv6"):
+            record["ip"] = address.get("addr")
+        elif address.get("addrtype") == "mac":
+            record["mac"] = address.get("addr")
+    status = host.find("status")
+    if status is not None:
+        record["status"] = status.get("state", "unknown")
+    record["hostnames"] = [hostname.get("name") for hostname in host.iter("hostname") if hostname.get("name")]
+    ports = host.find("ports")
+    if ports is not None:
+        record["ports"] = [_parse_port(port) for port in ports.iter("port")]
+    os_info = host.find("os")
+    if os_info is not None:
+        record["os"] = [{"name": match.get("name", ""), "accuracy": match.get("accuracy", "")}
+                        for match in os_info.iter("osmatch")]
+    trace = host.find("trace")
+    if trace is not None:
+        record["traceroute"] = [{"ttl": hop.get("ttl", ""), "ip": hop.get("ipaddr", ""), "rtt": hop.get("rtt", ""),
+                                 "host": hop.get("host", "")} for hop in trace.iter("hop")]
+    hostscript = host.find("hostscript")
+    if hostscript is not None:
+        record["scripts"] = _parse_scripts(hostscript)
+    return record
+
+
+def parse_nmap_xml(source: Union[str, Path, IO[bytes]]) -> Iterator[dict[str, Any]]:
+    # Hosts are yielded as soon as their closing tag is read and then dropped from the tree,
+    # so memory stays flat no matter how many hosts the scan covers
+    root: Optional[ET.Element] = None
+    for event, element in ET.iterparse(source, events=("start", "end")):
+        if root is None:
+            root = element
+        if event == "end" and element.tag == "host":
+            yield _parse_host(element)
+            element.clear()
+            root.clear()
+
+
+def open_ports(host: Optional[dict[str, Any]]) -> list[dict[str, Any]]:
+    if not host:
+        return []
+    return [port for port in host["ports"] if port["state"] == "open"]
+
+
+def _log_nmap_progress(line: str) -> None:
+    # nmap -v reports findings as they happen; surface them instead of waiting for the XML
+    if line.startswith(("Discovered open port", "Completed", "Nmap scan report")):
+        logger.info(f"nmap: {line}")
+    else:
+        logger.debug(f"nmap: {line}")
 
 
-def scan_host(ip: str, domain: str, scantype: str = DEFAULT_NMAP_SCANTYPE) -> list[dict[str, str]]:
+async def scan_host(ip: str, domain: str, scantype: str = DEFAULT_NMAP_SCANTYPE) -> Optional[dict[str, Any]]:
     output_dir = Path(domain) / "nmap"
     output_dir.mkdir(parents=True, exist_ok=True)
     xml_output = output_dir / f"{ip}.xml"
-    ports = []
 
     try:
         cmd = ["nmap"] + scantype.split() + ["-oX", str(xml_output), ip]
-        subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=300
-        )
-        if xml_output.exists():
-            with xml_output.open() as f:
-                for line in f:
-                    if "<port " in line and "state='open'" in line:
-                        port_info = line.split("portid=")[1].split(" ")[0].strip('"')
-                        protocol = line.split("protocol=")[1].split(" ")[0].strip('"')
-                        service = line.split("service name=")[1].split(" ")[0].strip(
-                            '"') if "service name=" in line else "unknown"
-                        ports.append({"port": f"{port_info}/{protocol}", "service": service})
-        return ports
-    except subprocess.TimeoutExpired:
+        await run_process(cmd, timeout=NMAP_HOST_TIMEOUT, on_line=_log_nmap_progress)
+        if not xml_output.exists():
+            return None
+        return next(parse_nmap_xml(xml_output), None)
+    except asyncio.TimeoutError:
         logger.info(f"Nmap scan timeout for {ip}")
-        return []
+        return None
+    except ET.ParseError as e:
+        logger.error(f"Error parsing nmap output for {ip}: {e}")
+        return None
     except Exception as e:
         logger.error(f"Error scanning {ip}: {e}")
+        return None
+
+
+def default_nmap_workers() -> int:
+    # nmap already parallelizes inside a batch, so half the cores keeps the machine responsive
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+def batch_ips(ips: list[str], workers: int, batch_size: int = NMAP_BATCH_SIZE) -> list[list[str]]:
+    if not ips:
         return []
+    # Shrink batches for small target sets so every worker gets something to scan
+    size = max(1, min(batch_size, math.ceil(len(ips) / max(1, workers))))
+    return [ips[i:i + size] for i in range(0, len(ips), size)]
+
+
+async def scan_batch(ips: list[str], domain: str, scantype: str = DEFAULT_NMAP_SCANTYPE,
+                     batch_index: int = 0) -> dict[str, dict[str, Any]]:
+    output_dir = Path(domain) / "nmap"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    targets_file = output_dir / f"batch-{batch_index:04d}.txt"
+    xml_output = output_dir / f"batch-{batch_index:04d}.xml"
+    targets_file.write_text("\n".join(ips) + "\n")
+    results: dict[str, dict[str, Any]] = {}
+
+    try:
+        cmd = (["nmap"] + scantype.split() + ["--host-timeout", f"{NMAP_HOST_TIMEOUT}s"]
+               + ["-oX", str(xml_output), "-iL", str(targets_file)])
+        await run_process(cmd, timeout=NMAP_HOST_TIMEOUT * len(ips), on_line=_log_nmap_progress)
+    except asyncio.TimeoutError:
+        logger.info(f"Nmap batch {batch_index} timed out, keeping the hosts finished so far")
+    except Exception as e:
+        logger.error(f"Error scanning batch {batch_index} ({len(ips)} hosts): {e}")
+        return results
+
+    if not xml_output.exists():
+        return results
+    try:
+        for host in parse_nmap_xml(xml_output):
+            if host["ip"]:
+                results[host["ip"]] = host
+    except ET.ParseError as e:
+        # A killed nmap leaves truncated XML; every host parsed before the break is still valid
+        logger.info(f"Nmap output for batch {batch_index} is incomplete: {e}")
+    return results
 
 
-def run_zenmap(domain: str) -> bool:
+async def run_zenmap(domain: str) -> bool:
     output_dir = Path(domain) / "nmap"
     try:
         if not output_dir.exists():
             logger.warning("No nmap output directory found")
             return False
-        subprocess.run([ZENMAP_COMMAND, str(output_dir)], check=False, timeout=30)
+        await run_process([ZENMAP_COMMAND, str(output_dir)], timeout=30)
         return True
     except FileNotFoundError:
         logger.warning("Zenmap not found, skipping")
         return False
-    except subprocess.TimeoutExpired:
+    except asyncio.TimeoutError:
         logger.info("Zenmap launch timed out")
         return False
     except Exception as e:
@@ -3,6 +3,8 @@ import logging
 from pathlib import Path
 from typing import Any
 
+from ndjson_stream import iter_records
+
 logger = logging.getLogger(__name__)
 
 
@@ -15,3 +17,21 @@ def save_json(data: dict[str, Any], output_file: str) -> None:
         logger.info(f"Results saved to {output_file}")
     except Exception as e:
         logger.error(f"Error saving JSON to {output_file}: {e}")
+
+
+def compact_ndjson(stream_file: str) -> dict[str, Any]:
+    # Rebuilds the save_json structure from a (possibly interrupted) analyzer stream
+    data: dict[str, Any] = {"domain": None, "ips": [], "domain_info": {"subdomains": [], "emails": []}}
+    for record in iter_records(stream_file):
+        record_type = record.get("type")
+        if record_type == "result":
+            return record["value"]
+        if record_type == "domain":
+            data["domain"] = record["value"]
+        elif record_type == "subdomain":
+            data["domain_info"]["subdomains"].append(record["value"])
+        elif record_type == "ip":
+            data["ips"].append(record["value"])
+        elif record_type == "domain_info":
+            data["domain_info"][record["key"]] = record["value"]
+    return data
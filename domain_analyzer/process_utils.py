@@ -0,0 +1,79 @@
+import asyncio
+import logging
+import os
+import signal
+import time
+from typing import Callable, Optional
+
+from constants import MAX_PROCESSES, PROCESS_KILL_GRACE
+from timing_utils import count
+
+logger = logging.getLogger(__name__)
+
+_max_processes = MAX_PROCESSES
+_process_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def set_max_processes(limit: int) -> None:
+    global _max_processes, _process_semaphore
+    _max_processes, _process_semaphore = max(1, limit), None
+
+
+def _get_process_semaphore() -> asyncio.Semaphore:
+    global _process_semaphore
+    if _process_semaphore is None:
+        _process_semaphore = asyncio.Semaphore(_max_processes)
+    return _process_semaphore
+
+
+def _signal_group(process: asyncio.subprocess.Process, sig: int) -> None:
+    try:
+        os.killpg(process.pid, sig)
+    except ProcessLookupError:
+        pass
+
+
+async def _terminate(process: asyncio.subprocess.Process) -> None:
+    # Children run in their own session, so the whole group (nmap and its helpers) goes down together
+    if process.returncode is not None:
+        return
+    _signal_group(process, signal.SIGTERM)
+    try:
+        await asyncio.wait_for(process.wait(), PROCESS_KILL_GRACE)
+    except asyncio.TimeoutError:
+        _signal_group(process, signal.SIGKILL)
+        await process.wait()
+
+
+async def run_process(cmd: list[str], timeout: Optional[float] = None,
+                      on_line: Optional[Callable[[str], None]] = None) -> tuple[int, str]:
+    # Runs cmd under the global process limit, streaming stdout+stderr lines to on_line as they arrive.
+    # Raises asyncio.TimeoutError on timeout; the child is killed on timeout and on cancellation.
+    async with _get_process_semaphore():
+        started = time.perf_counter()
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            start_new_session=True
+        )
+        lines: list[str] = []
+
+        async def communicate() -> int:
+            async for raw_line in process.stdout:
+                line = raw_line.decode(errors="replace").rstrip()
+                lines.append(line)
+                if on_line:
+                    on_line(line)
+            return await process.wait()
+
+        try:
+            returncode = await asyncio.wait_for(communicate(), timeout)
+        except BaseException:
+            await asyncio.shield(_terminate(process))
+            raise
+        finally:
+            count("subprocesses")
+            count("subprocess_seconds", time.perf_counter() - started)
+    return returncode, "\n".join(lines)
@@ -1,38 +1,158 @@
+import asyncio
+import hashlib
+import json
 import logging
+import os
+import re
+import time
+from pathlib import Path
+from typing import Any, Optional
 from urllib.parse import urlencode
 
-import requests
+import aiohttp
+
+from constants import ROBTEX_URL, ROBTEX_CACHE_DIR, ROBTEX_CACHE_TTL, ROBTEX_RATE, ROBTEX_CONCURRENCY, ROBTEX_TIMEOUT
+from timing_utils import count
 
 logger = logging.getLogger(__name__)
 
+DNS_LOOKUP_LINK = re.compile(r'href="/dns-lookup/([^"]+)"')
 
-def find_robtex_domains(domain: str, ns_servers: list[dict[str, str]], all_robtex: bool = False) -> set[str]:
-    related_domains = set()
-    base_url = "https://www.robtex.com/dns-lookup/"
 
-    for ns in ns_servers:
-        ns_hostname = ns["hostname"]
+class RateLimiter:
+    # Spaces requests at least 1/rate seconds apart across every caller in the process
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class RobtexCache:
+    # One JSON file per NS hostname holding the parsed page, so it can be shared by worker processes and runs
+    def __init__(self, directory: Optional[Path] = Path(ROBTEX_CACHE_DIR), ttl: float = ROBTEX_CACHE_TTL):
+        self.directory = Path(directory) if directory else None
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, ns_hostname: str) -> Path:
+        digest = hashlib.sha1(ns_hostname.lower().rstrip('.').encode()).hexdigest()
+        return self.directory / f"{digest}.json"
+
+    def get(self, ns_hostname: str) -> Optional[dict[str, Any]]:
+        if self.directory is None:
+            return None
+        try:
+            with self._path(ns_hostname).open() as f:
+                entry = json.load(f)
+            if entry["fetched_at"] + self.ttl > time.time():
+                self.hits += 1
+                return entry
+        except (OSError, ValueError, KeyError):
+            pass
+        self.misses += 1
+        return None
+
+    def put(self, ns_hostname: str, entry: dict[str, Any]) -> None:
+        if self.directory is None:
+            return
         try:
-            query = urlencode({"q": ns_hostname})
-            url = f"{base_url}?{query}"
-            headers = {"User-Agent": "Mozilla/5.0"}
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-
-            if all_robtex:
-                lines = response.text.splitlines()
-                for line in lines:
-                    if 'href="/dns-lookup/' in line:
-                        related_domain = line.split('href="/dns-lookup/')[1].split('"')[0]
-                        if related_domain.endswith(domain):
-                            related_domains.add(related_domain)
-            else:
-                if ns_hostname in response.text:
-                    related_domains.add(ns_hostname)
-
-        except requests.RequestException as e:
-            logger.error(f"Error fetching Robtex data for {ns_hostname}: {e}")
-        except Exception as e:
-            logger.error(f"Unexpected error processing Robtex for {ns_hostname}: {e}")
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self._path(ns_hostname)
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            with tmp_path.open('w') as f:
+                json.dump(entry, f)
+            tmp_path.replace(path)
+        except OSError as e:
+            logger.error(f"Error writing Robtex cache for {ns_hostname}: {e}")
+
+
+class RobtexClient:
+    # Shares the analyzer's connection pool; concurrent lookups of the same NS are collapsed into one request
+    def __init__(self, cache: RobtexCache, rate: float = ROBTEX_RATE, concurrency: int = ROBTEX_CONCURRENCY):
+        self.cache = cache
+        self.rate_limiter = RateLimiter(rate)
+        self.concurrency = max(1, concurrency)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._in_flight: dict[str, asyncio.Future] = {}
 
+    async def lookup(self, session: aiohttp.ClientSession, ns_hostname: str) -> Optional[dict[str, Any]]:
+        key = ns_hostname.lower().rstrip('.')
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        if key not in self._in_flight:
+            self._in_flight[key] = asyncio.ensure_future(self._fetch(session, key))
+            self._in_flight[key].add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(self._in_flight[key])
+
+    async def _fetch(self, session: aiohttp.ClientSession, ns_hostname: str) -> Optional[dict[str, Any]]:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        url = f"{ROBTEX_URL}?{urlencode({'q': ns_hostname})}"
+        async with self._semaphore:
+            await self.rate_limiter.wait()
+            try:
+                async with session.get(url, headers={"User-Agent": "Mozilla/5.0"},
+                                       timeout=aiohttp.ClientTimeout(total=ROBTEX_TIMEOUT)) as response:
+                    response.raise_for_status()
+                    count("http_requests")
+                    count("http_bytes", len(await response.read()))
+                    text = await response.text()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"Error fetching Robtex data for {ns_hostname}: {e}")
+                return None
+        entry = {
+            "fetched_at": time.time(),
+            "mentions_ns": ns_hostname in text,
+            "links": sorted(set(DNS_LOOKUP_LINK.findall(text))),
+        }
+        self.cache.put(ns_hostname, entry)
+        return entry
+
+
+_robtex_client: Optional[RobtexClient] = None
+
+
+def configure_robtex(cache_dir: Optional[str] = ROBTEX_CACHE_DIR, ttl: float = ROBTEX_CACHE_TTL,
+                     rate: float = ROBTEX_RATE) -> None:
+    global _robtex_client
+    _robtex_client = RobtexClient(RobtexCache(Path(cache_dir) if cache_dir else None, ttl), rate)
+
+
+def get_robtex_client() -> RobtexClient:
+    if _robtex_client is None:
+        configure_robtex()
+    return _robtex_client
+
+
+async def find_robtex_domains(domain: str, ns_servers: list[dict[str, str]], session: aiohttp.ClientSession,
+                              all_robtex: bool = False) -> set[str]:
+    client = get_robtex_client()
+    ns_hostnames = [ns["hostname"] for ns in ns_servers]
+    entries = await asyncio.gather(*(client.lookup(session, ns_hostname) for ns_hostname in ns_hostnames),
+                                   return_exceptions=True)
+
+    related_domains = set()
+    for ns_hostname, entry in zip(ns_hostnames, entries):
+        if isinstance(entry, Exception):
+            logger.error(f"Unexpected error processing Robtex for {ns_hostname}: {entry}")
+        elif entry is None:
+            continue
+        elif all_robtex:
+            related_domains.update(link for link in entry["links"] if link.endswith(domain))
+        elif entry["mentions_ns"]:
+            related_domains.add(ns_hostname)
     return related_domains
@@ -0,0 +1,76 @@
+import cProfile
+import contextvars
+import io
+import logging
+import pstats
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+from constants import PROFILE_TOP_FUNCTIONS
+
+logger = logging.getLogger(__name__)
+
+
+class Timings:
+    # Wall time per stage plus free-form counters for one analysis target
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.stages: dict[str, dict[str, float]] = {}
+        self.counters: defaultdict[str, float] = defaultdict(float)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stage = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+            stage["seconds"] += time.perf_counter() - start
+            stage["calls"] += 1
+
+    def count(self, name: str, value: float = 1) -> None:
+        self.counters[name] += value
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "total_seconds": round(time.perf_counter() - self.started, 3),
+            "stages": {name: {"seconds": round(stage["seconds"], 3), "calls": stage["calls"]}
+                       for name, stage in self.stages.items()},
+            "counters": {name: round(value, 3) if isinstance(value, float) and not value.is_integer() else int(value)
+                         for name, value in sorted(self.counters.items())},
+        }
+
+
+# Set per analyzer; asyncio tasks and to_thread calls copy the context, so helpers deep in
+# dns_utils/process_utils charge their counters to the target that triggered them
+_current_timings: contextvars.ContextVar[Optional[Timings]] = contextvars.ContextVar("timings", default=None)
+
+
+def set_current_timings(timings: Optional[Timings]) -> contextvars.Token:
+    return _current_timings.set(timings)
+
+
+def reset_current_timings(token: contextvars.Token) -> None:
+    _current_timings.reset(token)
+
+
+def count(name: str, value: float = 1) -> None:
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.count(name, value)
+
+
+def run_profiled(profile_file: Optional[str], func: Callable[..., Any], *args: Any) -> Any:
+    if not profile_file:
+        return func(*args)
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args)
+    finally:
+        profiler.dump_stats(profile_file)
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+        logger.info(f"Profile written to {profile_file} (inspect with python -m pstats)")
+        logger.debug(summary.getvalue())
@@ -0,0 +1,61 @@
+import asyncio
+import logging
+from typing import Any
+
+from constants import TLDS_FILE, TLD_SWEEP_CONCURRENCY, TLD_SWEEP_TIMEOUT, PARKING_NAMESERVERS
+from dns_utils import resolve_bulk, detect_wildcard_ips
+
+logger = logging.getLogger(__name__)
+
+PARKING_SUFFIXES: tuple[str, ...] = tuple(f".{nameserver}" for nameserver in PARKING_NAMESERVERS)
+
+
+def load_tlds(path: str = TLDS_FILE) -> list[str]:
+    tlds: list[str] = []
+    seen: set[str] = set()
+    with open(path) as f:
+        for line in f:
+            tld = line.strip().lower().strip('.')
+            if tld and not tld.startswith('#') and tld not in seen:
+                seen.add(tld)
+                tlds.append(tld)
+    return tlds
+
+
+def _is_parked(ns_records: list[dict[str, str]]) -> bool:
+    return any(f".{ns['hostname'].rstrip('.').lower()}".endswith(PARKING_SUFFIXES) for ns in ns_records)
+
+
+async def sweep_tlds(label: str, tlds: list[str], concurrency: int = TLD_SWEEP_CONCURRENCY,
+                     timeout: float = TLD_SWEEP_TIMEOUT) -> list[dict[str, Any]]:
+    # One bounded async sweep over every <label>.<tld>; hits are then checked against the TLD's
+    # wildcard answers (registry catch-alls) and their NS against known parking providers
+    # The TLD is kept with its name: multi-label ones (co.uk) cannot be recovered by splitting the name
+    names = {f"{label}.{tld}": tld for tld in tlds}
+    hits: dict[str, tuple[str, set[str]]] = {}
+    queries = ((name, 'A') for name in names)
+    async for name, _, records, _ in resolve_bulk(queries, concurrency=concurrency, timeout=timeout, retries=1):
+        if records:
+            hits[name] = (names[name], {record["ip"] for record in records})
+    if not hits:
+        return []
+
+    hit_tlds = sorted({tld for tld, _ in hits.values()})
+    wildcards = dict(zip(hit_tlds, await asyncio.gather(*(detect_wildcard_ips(tld) for tld in hit_tlds))))
+    ns_records: dict[str, list[dict[str, str]]] = {}
+    async for name, _, records, _ in resolve_bulk(((name, 'NS') for name in hits), concurrency=concurrency,
+                                                  timeout=timeout, retries=1):
+        ns_records[name] = records
+
+    results = []
+    for name, (tld, ips) in hits.items():
+        wildcard = bool(wildcards[tld]) and ips <= wildcards[tld]
+        results.append({"domain": name, "tld": tld, "ips": sorted(ips), "wildcard": wildcard,
+                        "parked": _is_parked(ns_records.get(name, []))})
+    logger.info(f"TLD sweep for {label}: {len(results)} of {len(tlds)} names resolve, "
+                f"{sum(r['wildcard'] for r in results)} wildcard, {sum(r['parked'] for r in results)} parked")
+    return sorted(results, key=lambda result: result["domain"])
+
+
+def registered_domains(results: list[dict[str, Any]]) -> list[str]:
+    return [result["domain"] for result in results if not result["wildcard"] and not result["parked"]]
@@ -0,0 +1,77 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+# Stream format shared by the crawler and the domain analyzer; both import this as a top-level module,
+# so it must not depend on either package
+logger = logging.getLogger(__name__)
+
+
+class NDJSONWriter:
+    # Every line is {"type": ..., "value": ..., **fields}; the record closing a run has type "result" and the
+    # complete output as its value. Records are buffered and appended with O_APPEND, so a crash loses at most
+    # one flush interval and concurrent writers do not interleave lines. Created inside a running event loop,
+    # the writer also flushes on a timer, so a quiet stretch (a long nmap run, the slow tail of a crawl) does
+    # not keep records in memory until the next write
+    def __init__(self, path: str, flush_interval: float, buffer_records: int):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_interval = flush_interval
+        self.buffer_records = buffer_records
+        self._buffer: list[str] = []
+        self._last_flush = time.monotonic()
+        self._fd: Optional[int] = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self._flusher: Optional[asyncio.Task] = None
+        try:
+            self._flusher = asyncio.get_running_loop().create_task(self._flush_periodically())
+        except RuntimeError:
+            pass
+
+    def write(self, record_type: str, value: Any, **fields: Any) -> None:
+        self._buffer.append(json.dumps({"type": record_type, "value": value, **fields}, ensure_ascii=False) + "\n")
+        if len(self._buffer) >= self.buffer_records or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buffer and self._fd is not None:
+            data = memoryview("".join(self._buffer).encode("utf-8"))
+            self._buffer = []
+            # os.write may take only part of the buffer (signals, nearly full disk); write the rest instead of dropping it
+            while data:
+                data = data[os.write(self._fd, data):]
+        self._last_flush = time.monotonic()
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.flush()
+
+    def close(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        if self._fd is None:
+            return
+        self.flush()
+        os.close(self._fd)
+        self._fd = None
+
+    def __enter__(self) -> "NDJSONWriter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def iter_records(stream_file: str) -> Iterator[dict[str, Any]]:
+    # The last line of an interrupted run may be cut off; it is skipped rather than failing the compaction
+    with open(stream_file, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                logger.debug(f"Skipping truncated record in {stream_file}")
@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# domain_analyzer modules import each other as top-level modules, the way `python domain_analyzer/main.py` runs them
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "domain_analyzer"))
+# The crawler package and the shared ndjson_stream module are imported from the repository root
+sys.path.append(str(Path(__file__).resolve().parent.parent))
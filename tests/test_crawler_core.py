@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web
+
+from crawler.src.crawler_checkpoint import CrawlCheckpoint
+from crawler.src.crawler_core import Crawler
+
+
+def site_app(delay: float = 0.0) -> web.Application:
+    # An endless site: every page links to three deeper pages
+    async def page(request: web.Request) -> web.Response:
+        number = int(request.match_info.get("number", 0))
+        await asyncio.sleep(delay)
+        links = "".join(f'<a href="/page/{number * 3 + i}">{i}</a>' for i in range(1, 4))
+        return web.Response(text=f"<html><body>{links}</body></html>", content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/", page)
+    app.router.add_get("/page/{number}", page)
+    return app
+
+
+class GatedSite:
+    # A finite site: page n links to pages 3n+1..3n+3 below `pages`; pages from `gate` on
+    # hang until release is set, so a crawl can be stopped at a known point
+    def __init__(self, pages: int, gate: int):
+        self.pages = pages
+        self.gate = gate
+        self.release = asyncio.Event()
+        self.requested: list[int] = []
+
+    async def page(self, request: web.Request) -> web.Response:
+        number = int(request.match_info.get("number", 0))
+        self.requested.append(number)
+        if number >= self.gate:
+            await self.release.wait()
+        links = "".join(f'<a href="/page/{child}">{child}</a>'
+                        for child in range(number * 3 + 1, number * 3 + 4) if child < self.pages)
+        return web.Response(text=f"<html><body>{links}</body></html>", content_type="text/html")
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/", self.page)
+        app.router.add_get("/page/{number}", self.page)
+        return app
+
+
+def page_number(url: str) -> int:
+    return int(url.rsplit("/", 1)[1]) if "/page/" in url else 0
+
+
+async def serve(app: web.Application) -> tuple[web.AppRunner, str]:
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    return runner, f"http://{host}:{port}/"
+
+
+def test_cancelled_crawl_reraises_and_keeps_partial_results():
+    async def main():
+        runner, base_url = await serve(site_app(delay=0.05))
+        crawler = Crawler(base_url, max_urls=100000, concurrency=4, progress_interval=0)
+        try:
+            with pytest.raises(TimeoutError):
+                async with asyncio.timeout(0.5):
+                    await crawler.crawl_site()
+            return crawler, asyncio.current_task().cancelling()
+        finally:
+            await runner.cleanup()
+
+    crawler, cancelling = asyncio.run(main())
+    # The outer timeout saw the cancellation, so the task is not left marked as cancelled
+    assert cancelling == 0
+    assert crawler.interrupted
+    results = crawler.results()
+    assert 0 < len(results["links"]) < 100000
+    assert results["links"] == sorted(set(results["links"]))
+
+
+def test_checkpoint_restores_interrupted_crawl_and_is_removed(tmp_path):
+    site = GatedSite(pages=40, gate=10)
+    options = {"max_urls": 1000, "concurrency": 2, "progress_interval": 0}
+
+    async def main():
+        runner, base_url = await serve(site.app())
+        try:
+            first = Crawler(base_url, checkpoint_dir=tmp_path, **options)
+            task = asyncio.create_task(first.crawl_site())
+            # Both workers are stuck on gated pages: the crawl is mid-way
+            async with asyncio.timeout(5):
+                while sum(number >= site.gate for number in site.requested) < options["concurrency"]:
+                    await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            site.release.set()
+            saved = CrawlCheckpoint.for_target(tmp_path, first.base_url)
+            saved_state = saved.load()
+            saved.close()
+
+            second = Crawler(base_url, checkpoint_dir=tmp_path, resume=True, **options)
+            restored = {}
+            crawl_url = second.crawl_url
+
+            async def crawl_url_after_restore(url):
+                # The first page of the resumed crawl: only the checkpoint could have filled the state yet
+                if not restored:
+                    restored["frontier"] = {url} | {queued for queued, _ in second.to_crawl}
+                    restored["crawled"] = set(second.crawled) - {url}
+                    restored["links"] = list(second.data["links"])
+                return await crawl_url(url)
+
+            second.crawl_url = crawl_url_after_restore
+            requested_before = len(site.requested)
+            resumed = await second.crawl_site()
+            requested_again = site.requested[requested_before:]
+            uninterrupted = await Crawler(base_url, **options).crawl_site()
+            return first, saved_state, restored, requested_again, resumed, uninterrupted
+        finally:
+            await runner.cleanup()
+
+    first, saved_state, restored, requested_again, resumed, uninterrupted = asyncio.run(main())
+    frontier = {url for url, _ in first.to_crawl}
+    crawled = set(first.crawled)
+    assert crawled and frontier
+    # The checkpoint holds the state at cancellation, pages in flight going back to the frontier
+    frontier_saved, crawled_saved, data_saved, _ = saved_state
+    assert {url for url, _ in frontier_saved} == frontier
+    assert set(crawled_saved) == crawled
+    assert [value for kind, value in data_saved if kind == "links"] == first.data["links"]
+    # ...and the resumed crawler starts from it
+    assert restored == {"frontier": frontier, "crawled": crawled, "links": first.data["links"]}
+    # Pages finished before the interruption are not fetched again, everything else is
+    assert sorted(requested_again) == sorted(set(range(site.pages)) - {page_number(url) for url in crawled})
+    assert resumed == uninterrupted
+    # A completed crawl leaves no checkpoint behind
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,184 @@
+import asyncio
+import hashlib
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web
+
+from crawler.src.crawler_downloads import DownloadManager
+
+CONTENT = bytes(range(256)) * 1024
+
+
+class FileServer:
+    # Serves files with a strong ETag and implements Range/If-Range itself: aiohttp's
+    # FileResponse only honours the date form of If-Range
+    def __init__(self, files: dict[str, bytes], etag: str = '"v1"'):
+        self.files = files
+        self.etag = etag
+        self.honour_range = True
+        self.check_if_range = True
+        self.chunked = False
+        self.requests: list[dict] = []
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        body = self.files[request.path]
+        self.requests.append({"path": request.path, "range": request.headers.get("Range"),
+                              "if_range": request.headers.get("If-Range")})
+        headers = {"ETag": self.etag}
+        requested = request.headers.get("Range")
+        if requested and self.honour_range and (not self.check_if_range
+                                                or request.headers.get("If-Range") == self.etag):
+            start = int(requested.removeprefix("bytes=").rstrip("-"))
+            if start >= len(body):
+                return web.Response(status=416, headers={"Content-Range": f"bytes */{len(body)}"})
+            headers["Content-Range"] = f"bytes {start}-{len(body) - 1}/{len(body)}"
+            return web.Response(status=206, body=body[start:], headers=headers)
+        if not self.chunked:
+            return web.Response(body=body, headers=headers)
+        # Without Content-Length the size limit can only be enforced while streaming
+        response = web.StreamResponse(headers=headers)
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+        for start in range(0, len(body), 16 * 1024):
+            await response.write(body[start:start + 16 * 1024])
+        await response.write_eof()
+        return response
+
+
+def run_downloads(server, scenario, **manager_kwargs):
+    async def main():
+        app = web.Application()
+        app.router.add_get("/{name:.*}", server.handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = runner.addresses[0][:2]
+        manager = DownloadManager(**manager_kwargs)
+        try:
+            async with aiohttp.ClientSession() as session:
+                manager.start(session)
+                try:
+                    return await scenario(manager, f"http://{host}:{port}")
+                finally:
+                    await manager.close()
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(main())
+
+
+def part_path(directory, url):
+    return directory / f".{hashlib.sha1(url.encode('utf-8')).hexdigest()}.part"
+
+
+def interrupted_download(directory, url, prefix: bytes, validator: str):
+    # What an interrupted earlier run leaves behind
+    part = part_path(directory, url)
+    part.write_bytes(prefix)
+    part.with_suffix(".validator").write_text(validator)
+
+
+def downloaded(directory) -> list[str]:
+    return sorted(path.name for path in directory.iterdir())
+
+
+def test_partial_download_is_resumed(tmp_path):
+    server = FileServer({"/files/data.bin": CONTENT})
+
+    async def scenario(manager, base):
+        url = f"{base}/files/data.bin"
+        interrupted_download(tmp_path, url, CONTENT[:100000], '"v1"')
+        return await manager._download(url, tmp_path), manager._hashes
+
+    saved, hashes = run_downloads(server, scenario)
+    assert saved
+    assert server.requests == [{"path": "/files/data.bin", "range": "bytes=100000-", "if_range": '"v1"'}]
+    assert downloaded(tmp_path) == ["data.bin"]
+    assert (tmp_path / "data.bin").read_bytes() == CONTENT
+    # The streamed hash covers the part downloaded by the earlier run as well
+    assert hashes == {hashlib.sha256(CONTENT).hexdigest(): tmp_path / "data.bin"}
+
+
+def test_full_response_restarts_download(tmp_path):
+    # The file changed on the server (If-Range no longer matches) or the server ignores Range:
+    # the stale .part must not be glued to the new body
+    server = FileServer({"/files/data.bin": CONTENT}, etag='"v2"')
+
+    async def scenario(manager, base):
+        url = f"{base}/files/data.bin"
+        interrupted_download(tmp_path, url, b"stale" * 1000, '"v1"')
+        first = await manager._download(url, tmp_path)
+        server.honour_range = False
+        (tmp_path / "data.bin").unlink()
+        interrupted_download(tmp_path, url, CONTENT[:100000], '"v2"')
+        return first, await manager._download(url, tmp_path)
+
+    assert run_downloads(server, scenario) == (True, True)
+    assert [request["range"] for request in server.requests] == ["bytes=5000-", "bytes=100000-"]
+    assert downloaded(tmp_path) == ["data.bin"]
+    assert (tmp_path / "data.bin").read_bytes() == CONTENT
+
+
+def test_range_not_satisfiable_for_complete_part(tmp_path):
+    server = FileServer({"/files/data.bin": CONTENT})
+
+    async def scenario(manager, base):
+        url = f"{base}/files/data.bin"
+        interrupted_download(tmp_path, url, CONTENT, '"v1"')
+        return await manager._download(url, tmp_path)
+
+    assert run_downloads(server, scenario)
+    assert len(server.requests) == 1
+    assert downloaded(tmp_path) == ["data.bin"]
+    assert (tmp_path / "data.bin").read_bytes() == CONTENT
+
+
+def test_range_not_satisfiable_for_changed_file_restarts(tmp_path):
+    # The file shrank on the server, which answers 416 without checking If-Range
+    server = FileServer({"/files/data.bin": CONTENT}, etag='"v2"')
+    server.check_if_range = False
+
+    async def scenario(manager, base):
+        url = f"{base}/files/data.bin"
+        interrupted_download(tmp_path, url, CONTENT * 2, '"v1"')
+        return await manager._download(url, tmp_path)
+
+    assert run_downloads(server, scenario)
+    assert [request["range"] for request in server.requests] == [f"bytes={len(CONTENT) * 2}-", None]
+    assert downloaded(tmp_path) == ["data.bin"]
+    assert (tmp_path / "data.bin").read_bytes() == CONTENT
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_oversized_file_is_aborted(tmp_path, chunked):
+    server = FileServer({"/files/big.bin": CONTENT})
+    server.chunked = chunked
+
+    async def scenario(manager, base):
+        return await manager._download(f"{base}/files/big.bin", tmp_path)
+
+    assert not run_downloads(server, scenario, max_file_bytes=len(CONTENT) - 1)
+    # Neither the file nor the .part/.validator leftovers stay on disk
+    assert downloaded(tmp_path) == []
+
+
+def test_same_content_is_saved_once(tmp_path):
+    server = FileServer({"/a/report.pdf": CONTENT, "/b/copy.pdf": CONTENT, "/c/other.pdf": CONTENT[::-1]})
+    (tmp_path / "old.pdf").write_bytes(CONTENT[::-1])
+
+    async def scenario(manager, base):
+        for path in ("/a/report.pdf", "/b/copy.pdf", "/c/other.pdf", "/a/report.pdf"):
+            manager.submit(f"{base}{path}", str(tmp_path))
+        await manager.join()
+
+    run_downloads(server, scenario)
+    # The repeated URL is not requested again
+    assert sorted(request["path"] for request in server.requests) == ["/a/report.pdf", "/b/copy.pdf", "/c/other.pdf"]
+    # One of the two identical files is kept; other.pdf matches a file from an earlier run
+    names = downloaded(tmp_path)
+    assert names in (["old.pdf", "report.pdf"], ["copy.pdf", "old.pdf"])
+    kept = next(name for name in names if name != "old.pdf")
+    assert (tmp_path / kept).read_bytes() == CONTENT
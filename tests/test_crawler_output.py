@@ -0,0 +1,18 @@
+from ndjson_stream import NDJSONWriter
+from crawler.src.crawler_output import compact_stream
+
+
+def test_compacted_results_follow_the_targets_order(tmp_path):
+    path = tmp_path / "results.ndjson"
+    targets = ["https://a.example", "https://b.example", "https://c.example"]
+    with NDJSONWriter(str(path), flush_interval=60, buffer_records=100) as stream:
+        # Worker processes finish in any order; c.example was interrupted before its final record
+        stream.write("links", "https://c.example/page", target="https://c.example")
+        stream.write("result", {"links": ["https://b.example/"]}, target="https://b.example")
+        stream.write("result", {"links": ["https://a.example/"]}, target="https://a.example")
+        stream.write("result", {"links": ["https://old.example/"]}, target="https://old.example")
+
+    results = compact_stream(path, targets)
+    assert [result["target"] for result in results] == targets + ["https://old.example"]
+    assert results[0]["result"] == {"links": ["https://a.example/"]}
+    assert results[2]["result"]["links"] == ["https://c.example/page"]
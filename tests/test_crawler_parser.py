@@ -0,0 +1,30 @@
+from crawler.src.crawler_parser import PageExtractor
+
+PAGE = b'<a href="/first.html">1</a><a href="/second.html">2</a> admin@example.com '
+
+
+def feed(page: bytes, max_bytes: int, chunk_size: int = 16) -> tuple[PageExtractor, list[bool]]:
+    extractor = PageExtractor(max_bytes=max_bytes)
+    within_limit = []
+    for start in range(0, len(page), chunk_size):
+        within_limit.append(extractor.feed_bytes(page[start:start + chunk_size]))
+        if not within_limit[-1]:
+            break
+    extractor.close()
+    return extractor, within_limit
+
+
+def test_page_of_exactly_max_bytes_is_not_truncated():
+    extractor, within_limit = feed(PAGE, max_bytes=len(PAGE))
+    assert all(within_limit)
+    assert not extractor.truncated
+    assert extractor.bytes_read == len(PAGE)
+    assert extractor.drain() == (["/first.html", "/second.html"], ["admin@example.com"])
+
+
+def test_bytes_beyond_the_limit_truncate_the_page():
+    extractor, within_limit = feed(PAGE + b"<a href='/third.html'>3</a>", max_bytes=len(PAGE))
+    assert within_limit[-1] is False
+    assert extractor.truncated
+    assert extractor.bytes_read == len(PAGE)
+    assert extractor.drain()[0] == ["/first.html", "/second.html"]
@@ -0,0 +1,70 @@
+import os
+from urllib.parse import urlparse, urlsplit
+
+import pytest
+
+from benchmarks.bench_classifier import load_corpus
+from benchmarks.record_url_corpus import DEFAULT_OUTPUT
+from crawler.src.crawler_utils import UrlClassifier, is_file_url, normalize_url
+
+# Links the recorded single-host corpus lacks: other hosts and subdomains, ports, case, ;params, bad URLs
+EXTRA_HREFS = [
+    "https://blog.doc.rust-lang.org/post.html",
+    "https://www.doc.rust-lang.org/archive/std.ZIP",
+    "//static.doc.rust-lang.org/a/b.pdf;jsessionid=1?x=2#top",
+    "https://doc.rust-lang.org:443/std/index.html",
+    "HTTPS://doc.rust-lang.org/Report.PDF",
+    "https://rust-lang.org/",
+    "https://github.com/rust-lang/rust/archive/master.zip",
+    "/files/report.pdf?download=1#page=2",
+    "/files/data.tar.gz",
+    "/files/.htaccess",
+    "../../std/",
+    "   /padded.html  ",
+    "#only-fragment",
+    "?only=query",
+    "mailto:docs@rust-lang.org",
+    "javascript:void(0)",
+    "ftp://doc.rust-lang.org/file.zip",
+    "http://[::1",
+    "",
+]
+
+
+def legacy_classify(href: str, page_url: str, base_url: str, allow_subdomains: bool):
+    # How the crawler classified links before UrlClassifier
+    normalized = normalize_url(href, page_url, allow_subdomains=allow_subdomains)
+    if not normalized:
+        return None, None, ''
+    parsed = urlparse(normalized)
+    base_netloc = urlparse(base_url).netloc
+    if not (parsed.netloc == base_netloc or (allow_subdomains and base_netloc in parsed.netloc)):
+        return normalized, UrlClassifier.EXTERNAL, ''
+    if not is_file_url(normalized):
+        return normalized, UrlClassifier.LINK, ''
+    return normalized, UrlClassifier.FILE, os.path.join(parsed.netloc.replace('www.', '').split(':')[0], 'Files')
+
+
+@pytest.fixture(scope="module")
+def corpus() -> list[tuple[str, str]]:
+    pairs = load_corpus(DEFAULT_OUTPUT)
+    pages = sorted({page_url for page_url, _ in pairs})
+    return pairs + [(page_url, href) for page_url in pages[:20] for href in EXTRA_HREFS]
+
+
+@pytest.mark.parametrize("allow_subdomains", [False, True])
+def test_classifier_matches_legacy_functions(corpus, allow_subdomains):
+    base_url = "https://doc.rust-lang.org"
+    classifier = UrlClassifier(base_url, allow_subdomains)
+    kinds = set()
+    for page_url, href in corpus:
+        expected = legacy_classify(href, page_url, base_url, allow_subdomains)
+        netloc = urlsplit(page_url).netloc
+        assert classifier.classify(href, page_url, netloc) == expected, (page_url, href)
+        assert classifier.normalize(href, page_url, netloc) == expected[0], (page_url, href)
+        if expected[0]:
+            assert classifier.is_file(expected[0]) == is_file_url(expected[0]), expected[0]
+        kinds.add(expected[1])
+    # The corpus exercises every outcome; without subdomains links to other hosts are dropped, not external
+    outcomes = {None, UrlClassifier.LINK, UrlClassifier.FILE}
+    assert kinds == (outcomes | {UrlClassifier.EXTERNAL} if allow_subdomains else outcomes)
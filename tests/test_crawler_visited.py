@@ -0,0 +1,94 @@
+import random
+
+import pytest
+
+from crawler.src.crawler_visited import BloomFilter, FingerprintSet, make_visited_set, url_fingerprint
+
+
+def make_url(index: int) -> str:
+    return f"https://www.example.com/catalog/item-{index:08d}.html"
+
+
+def urls_with_home(home: int, mask: int, count: int, taken=()) -> list[str]:
+    # URLs whose fingerprints start probing from the same slot of a table of mask + 1 slots
+    found = []
+    index = 0
+    while len(found) < count:
+        url = make_url(index)
+        if url_fingerprint(url) & mask == home and url not in taken:
+            found.append(url)
+        index += 1
+    return found
+
+
+def test_fingerprint_set_add_contains_grow():
+    visited = FingerprintSet(capacity=4)
+    initial_bytes = visited.memory_bytes()
+    urls = [make_url(index) for index in range(5000)]
+    visited.update(urls)
+    visited.update(urls[:100])
+
+    assert len(visited) == len(urls)
+    assert all(url in visited for url in urls)
+    assert not any(make_url(index) in visited for index in range(5000, 10000))
+    # Grown past the initial table while keeping the load factor below the limit
+    assert visited.memory_bytes() > initial_bytes
+    assert len(visited) <= 0.6 * len(visited._table)
+
+
+def test_fingerprint_set_discard_shifts_probe_chain_back():
+    visited = FingerprintSet(capacity=4)
+    mask = visited._mask
+    # Three URLs compete for the last slot and wrap around to the start of the table,
+    # the fourth belongs right after them and is pushed further by the chain
+    first, second, third = urls_with_home(mask, mask, 3)
+    fourth, = urls_with_home(0, mask, 1)
+    visited.update([first, second, third, fourth])
+    assert visited._mask == mask
+
+    visited.discard(first)
+    visited.discard(first)
+
+    assert len(visited) == 3
+    assert first not in visited
+    assert all(url in visited for url in (second, third, fourth))
+    # No gaps are left in the chain: it is exactly one slot shorter
+    occupied = [index for index, fingerprint in enumerate(visited._table) if fingerprint]
+    assert occupied == [0, 1, mask]
+
+
+def test_fingerprint_set_discard_matches_set():
+    rng = random.Random(17)
+    visited, reference = FingerprintSet(capacity=64), set()
+    for _ in range(20000):
+        url = make_url(rng.randrange(3000))
+        if rng.random() < 0.6:
+            visited.add(url)
+            reference.add(url)
+        else:
+            visited.discard(url)
+            reference.discard(url)
+
+    assert len(visited) == len(reference)
+    assert all((make_url(index) in visited) == (make_url(index) in reference) for index in range(3000))
+
+
+@pytest.mark.parametrize("error_rate", [1e-2, 1e-3])
+def test_bloom_filter_false_positive_rate(error_rate):
+    capacity, probes = 20000, 100000
+    visited = BloomFilter(capacity, error_rate)
+    urls = [make_url(index) for index in range(capacity)]
+    visited.update(urls)
+
+    assert all(url in visited for url in urls)
+    rate = sum(make_url(capacity + index) in visited for index in range(probes)) / probes
+    # Filled to capacity the measured rate stays close to the configured one
+    assert 0.5 * error_rate <= rate <= 1.5 * error_rate
+
+
+def test_make_visited_set():
+    assert isinstance(make_visited_set("set", 10), set)
+    assert isinstance(make_visited_set("fingerprint", 10), FingerprintSet)
+    assert isinstance(make_visited_set("bloom", 10), BloomFilter)
+    with pytest.raises(ValueError):
+        make_visited_set("list", 10)
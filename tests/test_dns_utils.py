@@ -0,0 +1,59 @@
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+pytest.importorskip("dns")
+pytest.importorskip("geoip2")
+
+from dns_utils import DNSCache
+
+
+def save_worker_entries(path: str, worker: int, count: int) -> None:
+    cache = DNSCache(path=None)
+    cache.load(path)
+    for index in range(count):
+        cache.put(f"host{index}.worker{worker}.example.com", "A", [{"ip": f"192.0.2.{index}"}], ttl=3600)
+    cache.save()
+
+
+def test_worker_saves_are_merged(tmp_path):
+    path = str(tmp_path / "dns_cache.json")
+    workers, per_worker = 4, 50
+    # Batch mode: every worker process loads the same file at start-up and saves it at teardown
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for future in [executor.submit(save_worker_entries, path, worker, per_worker) for worker in range(workers)]:
+            future.result()
+
+    cache = DNSCache()
+    cache.load(path)
+    for worker in range(workers):
+        for index in range(per_worker):
+            assert cache.get(f"host{index}.worker{worker}.example.com", "A") == ([{"ip": f"192.0.2.{index}"}], None)
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_fresher_entry_wins_and_size_is_bounded(tmp_path):
+    path = tmp_path / "dns_cache.json"
+
+    def stored():
+        return [(name, rdtype, records) for name, rdtype, _, records, _ in json.loads(path.read_text())]
+
+    first = DNSCache(path=path)
+    first.put("www.example.com", "A", [{"ip": "192.0.2.1"}], ttl=3600)
+    first.put("old.example.com", "A", [{"ip": "192.0.2.2"}], ttl=3600)
+    first.save()
+
+    second = DNSCache(path=path)
+    second.put("www.example.com", "A", [{"ip": "192.0.2.10"}], ttl=7200)
+    second.put("ns.example.com", "A", [{"ip": "192.0.2.3"}], ttl=3600)
+    second.save()
+    assert stored() == [
+        ("old.example.com", "A", [{"ip": "192.0.2.2"}]),
+        ("www.example.com", "A", [{"ip": "192.0.2.10"}]),
+        ("ns.example.com", "A", [{"ip": "192.0.2.3"}]),
+    ]
+
+    # The file keeps the in-memory bound, dropping the least recently used entries
+    DNSCache(max_entries=2, path=path).save()
+    assert [name for name, _, _ in stored()] == ["www.example.com", "ns.example.com"]
@@ -0,0 +1,50 @@
+import asyncio
+import json
+import os
+
+import ndjson_stream
+from ndjson_stream import NDJSONWriter, iter_records
+from output_utils import compact_ndjson
+
+
+def test_short_writes_are_completed(tmp_path, monkeypatch):
+    real_write = os.write
+    monkeypatch.setattr(ndjson_stream.os, "write", lambda fd, data: real_write(fd, bytes(data[:7])))
+    path = tmp_path / "stream.ndjson"
+    with NDJSONWriter(str(path), flush_interval=60, buffer_records=100) as stream:
+        stream.write("subdomain", "www.пример.рф")
+        stream.write("domain_info", ["ns1.example.com"], key="NS")
+
+    assert [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()] == [
+        {"type": "subdomain", "value": "www.пример.рф"},
+        {"type": "domain_info", "value": ["ns1.example.com"], "key": "NS"},
+    ]
+
+
+def test_truncated_last_record_is_skipped(tmp_path):
+    path = tmp_path / "stream.ndjson"
+    with NDJSONWriter(str(path), flush_interval=60, buffer_records=100) as stream:
+        stream.write("domain", "example.com")
+        stream.write("ip", {"ip": "192.0.2.1"})
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"type": "ip", "val')
+
+    assert [record["type"] for record in iter_records(str(path))] == ["domain", "ip"]
+    data = compact_ndjson(str(path))
+    assert data["domain"] == "example.com"
+    assert data["ips"] == [{"ip": "192.0.2.1"}]
+
+
+def test_quiet_writer_flushes_on_a_timer(tmp_path):
+    path = tmp_path / "stream.ndjson"
+
+    async def main():
+        stream = NDJSONWriter(str(path), flush_interval=0.05, buffer_records=100)
+        stream.write("subdomain", "www.example.com")
+        # No further writes: the record must reach the file without waiting for one
+        await asyncio.sleep(0.2)
+        on_disk = path.read_text(encoding="utf-8")
+        stream.close()
+        return on_disk
+
+    assert asyncio.run(main()) == '{"type": "subdomain", "value": "www.example.com"}\n'
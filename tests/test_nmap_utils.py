@@ -0,0 +1,109 @@
+import asyncio
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+import pytest
+
+import nmap_utils
+from nmap_utils import parse_nmap_xml, open_ports, scan_batch
+
+NMAP_XML = Path(__file__).parent / "data" / "nmap_batch.xml"
+
+
+@pytest.fixture
+def hosts():
+    return list(parse_nmap_xml(NMAP_XML))
+
+
+def test_every_host_is_parsed(hosts):
+    assert [host["ip"] for host in hosts] == ["45.33.32.156", "45.33.49.119"]
+    assert [host["status"] for host in hosts] == ["up", "up"]
+    assert hosts[0]["hostnames"] == ["scanme.nmap.org"]
+    assert hosts[1]["hostnames"] == []
+
+
+def test_ports_and_services(hosts):
+    ports = {port["port"]: port for port in hosts[0]["ports"]}
+    assert list(ports) == ["22/tcp", "80/tcp", "443/tcp", "9929/tcp"]
+    assert ports["22/tcp"] == {
+        "port": "22/tcp",
+        "protocol": "tcp",
+        "state": "open",
+        "reason": "syn-ack",
+        "service": "ssh",
+        "product": "OpenSSH",
+        "version": "6.6.1p1 Ubuntu 2ubuntu2.13",
+        "extrainfo": "Ubuntu Linux; protocol 2.0",
+        "scripts": ports["22/tcp"]["scripts"],
+    }
+    assert ports["443/tcp"]["state"] == "filtered"
+    assert ports["443/tcp"]["reason"] == "no-response"
+    assert ports["443/tcp"]["product"] == ""
+    assert [port["port"] for port in open_ports(hosts[0])] == ["22/tcp", "80/tcp", "9929/tcp"]
+    assert [port["service"] for port in open_ports(hosts[1])] == ["http"]
+
+
+def test_nse_scripts(hosts):
+    ports = {port["port"]: port for port in hosts[0]["ports"]}
+    assert [script["id"] for script in ports["80/tcp"]["scripts"]] == ["http-server-header", "http-title"]
+    assert ports["80/tcp"]["scripts"][1]["output"] == "Go ahead and ScanMe!"
+    ssh_hostkey = ports["22/tcp"]["scripts"][0]
+    assert ssh_hostkey["id"] == "ssh-hostkey"
+    assert "(ED25519)" in ssh_hostkey["output"]
+    assert ports["443/tcp"]["scripts"] == []
+    assert hosts[0]["scripts"] == [{"id": "clock-skew", "output": "mean: -1s, deviation: 0s, median: -1s"}]
+    assert hosts[1]["scripts"] == []
+
+
+def test_os_matches(hosts):
+    assert hosts[0]["os"] == [
+        {"name": "Linux 4.15 - 5.8", "accuracy": "96"},
+        {"name": "Linux 5.0 - 5.4", "accuracy": "95"},
+    ]
+    # <os> with only portused elements: nmap had too little to guess from
+    assert hosts[1]["os"] == []
+
+
+def test_traceroute(hosts):
+    assert hosts[0]["traceroute"] == [
+        {"ttl": "1", "ip": "192.168.1.1", "rtt": "0.41", "host": ""},
+        {"ttl": "2", "ip": "10.20.0.1", "rtt": "8.92", "host": ""},
+        {"ttl": "10", "ip": "173.230.159.57", "rtt": "150.33", "host": "173.230.159.57"},
+        {"ttl": "11", "ip": "45.33.32.156", "rtt": "151.02", "host": "scanme.nmap.org"},
+    ]
+    assert [hop["ttl"] for hop in hosts[1]["traceroute"]] == ["1", "12"]
+
+
+def test_file_object_source():
+    with NMAP_XML.open("rb") as f:
+        assert [host["ip"] for host in parse_nmap_xml(f)] == ["45.33.32.156", "45.33.49.119"]
+
+
+def test_truncated_output_yields_finished_hosts_first(tmp_path):
+    # A killed nmap stops mid-host; scan_batch keeps every host yielded before the ParseError
+    xml = NMAP_XML.read_bytes()
+    second_host = xml.index(b"<host ", xml.index(b"<host ") + 1)
+    truncated = tmp_path / "batch-0000.xml"
+    truncated.write_bytes(xml[:second_host + 300])
+
+    hosts = parse_nmap_xml(truncated)
+    first = next(hosts)
+    assert first["ip"] == "45.33.32.156"
+    assert [port["port"] for port in open_ports(first)] == ["22/tcp", "80/tcp", "9929/tcp"]
+    with pytest.raises(ET.ParseError):
+        next(hosts)
+
+
+def test_scan_batch_keeps_hosts_from_a_timed_out_run(tmp_path, monkeypatch):
+    xml = NMAP_XML.read_bytes()
+    cut = xml.index(b"<host ", xml.index(b"<host ") + 1) + 300
+
+    async def killed_nmap(cmd, timeout=None, on_line=None):
+        Path(cmd[cmd.index("-oX") + 1]).write_bytes(xml[:cut])
+        raise asyncio.TimeoutError()
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(nmap_utils, "run_process", killed_nmap)
+    results = asyncio.run(scan_batch(["45.33.32.156", "45.33.49.119"], "scanme.nmap.org"))
+    assert list(results) == ["45.33.32.156"]
+    assert (tmp_path / "scanme.nmap.org" / "nmap" / "batch-0000.txt").read_text() == "45.33.32.156\n45.33.49.119\n"
@@ -0,0 +1,165 @@
+import asyncio
+import time
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web
+
+import robtex_utils
+from robtex_utils import RateLimiter, RobtexCache, RobtexClient, configure_robtex, find_robtex_domains
+
+# Trimmed robtex.com dns-lookup pages: related names are links to /dns-lookup/<name>
+PAGES = {
+    "ns1.example.com": (
+        '<h1>ns1.example.com</h1>'
+        '<a href="/dns-lookup/example.com">example.com</a>'
+        '<a href="/dns-lookup/shop.example.com">shop.example.com</a>'
+        '<a href="/dns-lookup/example.com">example.com</a>'
+        '<a href="/dns-lookup/other.org">other.org</a>'
+    ),
+    "ns2.example.net": '<h1>No records</h1><a href="/dns-lookup/mail.example.com">mail.example.com</a>',
+}
+
+
+class RobtexStandIn:
+    # Serves PAGES at /dns-lookup/?q=<ns> and records when each request arrived
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.requests: list[tuple[str, float]] = []
+
+    async def handle(self, request: web.Request) -> web.Response:
+        query = request.query["q"]
+        self.requests.append((query, time.monotonic()))
+        await asyncio.sleep(self.delay)
+        if query not in PAGES:
+            return web.Response(status=500)
+        return web.Response(text=PAGES[query], content_type="text/html")
+
+    def queries(self) -> list[str]:
+        return [query for query, _ in self.requests]
+
+
+def run_against(monkeypatch, stand_in, scenario):
+    async def main():
+        app = web.Application()
+        app.router.add_get("/dns-lookup/", stand_in.handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = runner.addresses[0][:2]
+        monkeypatch.setattr(robtex_utils, "ROBTEX_URL", f"http://{host}:{port}/dns-lookup/")
+        try:
+            async with aiohttp.ClientSession() as session:
+                return await scenario(session)
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(main())
+
+
+def test_cached_lookup_skips_request(tmp_path, monkeypatch):
+    stand_in = RobtexStandIn()
+    client = RobtexClient(RobtexCache(tmp_path, ttl=3600), rate=0)
+
+    async def scenario(session):
+        first = await client.lookup(session, "ns1.example.com")
+        second = await client.lookup(session, "NS1.example.com.")
+        # Another run (or worker process) sharing the cache directory
+        third = await RobtexClient(RobtexCache(tmp_path, ttl=3600), rate=0).lookup(session, "ns1.example.com")
+        return first, second, third
+
+    first, second, third = run_against(monkeypatch, stand_in, scenario)
+    assert stand_in.queries() == ["ns1.example.com"]
+    assert first == second == third
+    assert (client.cache.hits, client.cache.misses) == (1, 1)
+
+
+def test_expired_entry_is_refetched(tmp_path, monkeypatch):
+    stand_in = RobtexStandIn()
+    client = RobtexClient(RobtexCache(tmp_path, ttl=0.05), rate=0)
+
+    async def scenario(session):
+        first = await client.lookup(session, "ns1.example.com")
+        await asyncio.sleep(0.1)
+        second = await client.lookup(session, "ns1.example.com")
+        return first, second
+
+    first, second = run_against(monkeypatch, stand_in, scenario)
+    assert stand_in.queries() == ["ns1.example.com", "ns1.example.com"]
+    assert second["fetched_at"] > first["fetched_at"]
+    assert (client.cache.hits, client.cache.misses) == (0, 2)
+
+
+def test_failed_fetch_is_not_cached(tmp_path, monkeypatch):
+    stand_in = RobtexStandIn()
+    client = RobtexClient(RobtexCache(tmp_path, ttl=3600), rate=0)
+
+    async def scenario(session):
+        return [await client.lookup(session, "broken.example.com") for _ in range(2)]
+
+    assert run_against(monkeypatch, stand_in, scenario) == [None, None]
+    assert stand_in.queries() == ["broken.example.com", "broken.example.com"]
+
+
+def test_concurrent_lookups_share_one_request(tmp_path, monkeypatch):
+    stand_in = RobtexStandIn(delay=0.2)
+    client = RobtexClient(RobtexCache(tmp_path, ttl=3600), rate=0)
+
+    async def scenario(session):
+        names = ["ns1.example.com", "NS1.example.com", "ns1.example.com.", "ns1.example.com", "Ns1.Example.Com"]
+        return await asyncio.gather(*(client.lookup(session, name) for name in names))
+
+    entries = run_against(monkeypatch, stand_in, scenario)
+    assert stand_in.queries() == ["ns1.example.com"]
+    assert all(entry == entries[0] for entry in entries)
+    assert client._in_flight == {}
+
+
+def test_requests_are_rate_limited(tmp_path, monkeypatch):
+    rate = 20.0
+    stand_in = RobtexStandIn()
+    client = RobtexClient(RobtexCache(None), rate=rate)
+
+    async def scenario(session):
+        names = ["ns1.example.com", "ns2.example.net", "ns3.example.org", "ns4.example.org"]
+        await asyncio.gather(*(client.lookup(session, name) for name in names))
+
+    run_against(monkeypatch, stand_in, scenario)
+    arrivals = sorted(arrived for _, arrived in stand_in.requests)
+    assert len(arrivals) == 4
+    # Small slack for timer granularity; without the limiter all four arrive within a few milliseconds
+    assert all(later - earlier >= 0.9 / rate for earlier, later in zip(arrivals, arrivals[1:]))
+
+
+def test_rate_limiter_spacing():
+    rate, calls = 50.0, 6
+    limiter = RateLimiter(rate)
+
+    async def main():
+        started = time.monotonic()
+        await asyncio.gather(*(limiter.wait() for _ in range(calls)))
+        return time.monotonic() - started
+
+    assert asyncio.run(main()) >= 0.9 * (calls - 1) / rate
+    assert RateLimiter(0).interval == 0.0
+
+
+def test_find_robtex_domains_parses_links(tmp_path, monkeypatch):
+    stand_in = RobtexStandIn()
+    monkeypatch.setattr(robtex_utils, "_robtex_client", None)
+    configure_robtex(str(tmp_path), ttl=3600, rate=0)
+    ns_servers = [{"hostname": "ns1.example.com"}, {"hostname": "ns2.example.net"},
+                  {"hostname": "broken.example.com"}]
+
+    async def scenario(session):
+        return (await find_robtex_domains("example.com", ns_servers, session, all_robtex=True),
+                await find_robtex_domains("example.com", ns_servers, session))
+
+    linked, mentioned = run_against(monkeypatch, stand_in, scenario)
+    assert linked == {"example.com", "shop.example.com", "mail.example.com"}
+    assert mentioned == {"ns1.example.com"}
+    # Both calls share the cache; only the failing NS is asked twice
+    assert sorted(stand_in.queries()) == ["broken.example.com", "broken.example.com",
+                                          "ns1.example.com", "ns2.example.net"]
@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("dns")
+pytest.importorskip("geoip2")
+
+import tld_utils
+
+# A answers per name; everything under co.uk resolves to the registry's catch-all address
+A_RECORDS = {
+    "example.com": ["198.51.100.1"],
+    "example.co.uk": ["192.0.2.10"],
+    "example.uk": ["203.0.113.5"],
+}
+WILDCARDS = {"co.uk": {"192.0.2.10"}}
+
+
+async def fake_resolve_bulk(queries, **_):
+    for name, rdtype in queries:
+        if rdtype == 'A':
+            yield name, rdtype, [{"ip": ip} for ip in A_RECORDS.get(name, [])], None
+        else:
+            yield name, rdtype, [{"hostname": f"ns1.{name}."}], None
+
+
+def test_multi_label_tld_is_reported_and_checked_for_wildcards(monkeypatch):
+    wildcard_checks = []
+
+    async def fake_detect_wildcard_ips(tld):
+        wildcard_checks.append(tld)
+        return WILDCARDS.get(tld, set())
+
+    monkeypatch.setattr(tld_utils, "resolve_bulk", fake_resolve_bulk)
+    monkeypatch.setattr(tld_utils, "detect_wildcard_ips", fake_detect_wildcard_ips)
+    results = asyncio.run(tld_utils.sweep_tlds("example", ["com", "co.uk", "uk", "org"]))
+
+    assert sorted(wildcard_checks) == ["co.uk", "com", "uk"]
+    assert [(result["domain"], result["tld"], result["wildcard"]) for result in results] == [
+        ("example.co.uk", "co.uk", True),
+        ("example.com", "com", False),
+        ("example.uk", "uk", False),
+    ]
+    assert tld_utils.registered_domains(results) == ["example.com", "example.uk"]